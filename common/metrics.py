@@ -0,0 +1,202 @@
+# =====================================================
+# common/metrics.py (histograms, counters and gauges, scraped as Prometheus text over local HTTP)
+# =====================================================
+import asyncio, bisect, os, time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import grpc
+
+from common.logs import setup
+
+log = setup("metrics")
+
+METRICS_ADDR = os.environ.get("HC_METRICS_ADDR", "127.0.0.1") # local only unless asked otherwise
+# seconds; fork phases run from ~100us (an empty qcow2) to tens of seconds (a big save)
+BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+
+# Recording is a dict lookup plus a couple of adds on the event loop thread: no locks, no
+# formatting. Everything is turned into text only when something scrapes /metrics.
+
+class _Metric:
+    kind = ""
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[tuple, object] = {}
+        registry.append(self)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._child()
+        return child
+
+    def _samples(self) -> Iterable[Tuple[str, tuple, float]]:
+        for values, child in self.children.items():
+            yield "", values, child.value
+
+    def render(self, out: List[str]):
+        samples = list(self._samples())
+        if not samples:
+            return # nothing recorded in this process (e.g. a hostd-only metric in the controller)
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for suffix, values, v in samples:
+            out.append(f"{self.name}{suffix}{_labels(self.labelnames, values)} {v:g}")
+
+class _Value:
+    __slots__ = ("value",)
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1):
+        self.value += n
+
+    def set(self, v: float):
+        self.value = v
+
+class Counter(_Metric):
+    kind = "counter"
+    _child = _Value
+
+class Gauge(_Metric):
+    """set() per label set, or collect(): called at scrape time for (labelvalues, value) pairs,
+    for gauges that are cheaper to read off existing state than to keep up to date."""
+    kind = "gauge"
+    _child = _Value
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), collect: Callable = None):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def _samples(self):
+        yield from super()._samples()
+        if self.collect:
+            for values, v in self.collect():
+                yield "", tuple(values), v
+
+class _Timer:
+    __slots__ = ("h", "t0")
+    def __init__(self, h):
+        self.h = h
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.h.observe(time.perf_counter() - self.t0)
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last one: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """with h.labels(...).time(): ... -- observes the block's wall time."""
+        return _Timer(self)
+
+class Histogram(_Metric):
+    kind = "histogram"
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _child(self):
+        return _Buckets(self.buckets)
+
+    def render(self, out: List[str]):
+        if not self.children:
+            return
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        names = self.labelnames + ("le",)
+        for values, b in self.children.items():
+            acc = 0
+            for le, n in zip(self.buckets + ("+Inf",), b.counts):
+                acc += n
+                out.append(f"{self.name}_bucket{_labels(names, values + (le,))} {acc}")
+            lbl = _labels(self.labelnames, values)
+            out.append(f"{self.name}_sum{lbl} {b.sum:g}")
+            out.append(f"{self.name}_count{lbl} {b.count}")
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+registry: List[_Metric] = []
+
+# --- shared by controller and hostd; each process only shows what it records ---
+PHASE = Histogram("hc_phase_seconds", "Time spent in each step of spawning, forking and restoring VMs.", ["phase"])
+RPC = Histogram("hc_rpc_seconds", "gRPC round trip as seen by the caller (for streams: until the stream ends).", ["method"])
+SPAWN_FAILURES = Counter("hc_spawn_failures_total", "VMs that were asked for and didn't come up.", ["op", "reason"])
+
+def render() -> str:
+    out: List[str] = []
+    for m in registry:
+        m.render(out)
+    return "\n".join(out) + "\n"
+
+def _timed(call, method):
+    t0 = time.perf_counter()
+    h = RPC.labels(method.decode() if isinstance(method, bytes) else method)
+    call.add_done_callback(lambda _: h.observe(time.perf_counter() - t0))
+    return call
+
+class _UnaryTimer(grpc.aio.UnaryUnaryClientInterceptor):
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        return _timed(await continuation(client_call_details, request), client_call_details.method)
+
+class _StreamTimer(grpc.aio.UnaryStreamClientInterceptor):
+    async def intercept_unary_stream(self, continuation, client_call_details, request):
+        return _timed(await continuation(client_call_details, request), client_call_details.method)
+
+class _BidiTimer(grpc.aio.StreamStreamClientInterceptor):
+    async def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        return _timed(await continuation(client_call_details, request_iterator), client_call_details.method)
+
+def rpc_timers() -> list:
+    """Client interceptors for a channel: every unary, server-streaming and bidi call on it goes
+    into RPC, by method, timed from the call until it's done (a done callback, nothing awaited
+    in between). grpc.aio files each interceptor under one call type, hence one per type."""
+    return [_UnaryTimer(), _StreamTimer(), _BidiTimer()]
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        req = await reader.readuntil(b"\r\n\r\n")
+        path = req.split(b" ", 2)[1] if req.count(b" ") >= 2 else b""
+        if path.split(b"?")[0] == b"/metrics":
+            status, ctype, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", render().encode()
+        else:
+            status, ctype, body = "404 Not Found", "text/plain", b"try /metrics\n"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(port: int, host: str = METRICS_ADDR) -> asyncio.AbstractServer:
+    """GET /metrics on host:port, Prometheus text format. None if it can't listen there:
+    metrics are worth a warning, not the process."""
+    try:
+        server = await asyncio.start_server(_handle, host, port)
+    except OSError as e:
+        log.warning(f"no metrics endpoint on {host}:{port}: {e}")
+        return None
+    log.info(f"metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,90 @@
+# =====================================================
+# common/streams.py (streaming exec: process pipes <-> gRPC stream, bounded; relaying it a hop)
+# =====================================================
+import asyncio
+from typing import AsyncIterator
+
+from proto import api_pb2 as pb
+from common.logs import setup
+
+log = setup("streams")
+
+CHUNK = 64 << 10 # max bytes read off a pipe per ExecChunk
+MAX_QUEUED = 8   # chunks waiting for the stream; past that we stop reading and the process blocks on its writes
+
+async def exec_stream(requests: AsyncIterator[pb.ExecInput]) -> AsyncIterator[pb.ExecChunk]:
+    """Run the argv from the first ExecInput, feed it the stdin that follows, and yield its
+    stdout/stderr as they're produced, ending with an exited=true chunk. Memory is bounded by
+    MAX_QUEUED * CHUNK: each yield waits for gRPC to take the message (flow control), so a slow
+    reader stalls the pipes and then the process. If the consumer goes away (the generator is
+    cancelled or closed), the process is killed."""
+    first = await anext(requests, None)
+    if first is None:
+        return
+    proc = await asyncio.create_subprocess_exec(*first.argv, stdin=asyncio.subprocess.PIPE,
+                                                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    q: asyncio.Queue = asyncio.Queue(MAX_QUEUED)
+
+    async def pump_out(pipe, field: str):
+        while data := await pipe.read(CHUNK):
+            await q.put(pb.ExecChunk(**{field: data}))
+        await q.put(None)
+
+    async def pump_in():
+        try:
+            msg = first
+            while True:
+                if msg.stdin:
+                    proc.stdin.write(msg.stdin)
+                    await proc.stdin.drain()
+                if msg.stdin_eof:
+                    break
+                msg = await anext(requests, None)
+                if msg is None:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass # it stopped reading; its output still counts
+        finally:
+            proc.stdin.close()
+
+    timed_out = False
+    def expire():
+        nonlocal timed_out
+        timed_out = True
+        proc.kill()
+    timer = asyncio.get_running_loop().call_later(first.timeout_sec, expire) if first.timeout_sec > 0 else None
+    tasks = [asyncio.create_task(pump_out(proc.stdout, "stdout")), asyncio.create_task(pump_out(proc.stderr, "stderr")),
+             asyncio.create_task(pump_in())]
+    try:
+        open_pipes = 2
+        while open_pipes:
+            chunk = await q.get()
+            if chunk is None:
+                open_pipes -= 1
+                continue
+            yield chunk
+        code = await proc.wait()
+        yield pb.ExecChunk(exited=True, exit_code=124 if timed_out else code)
+    finally:
+        if timer:
+            timer.cancel()
+        for t in tasks:
+            t.cancel()
+        if proc.returncode is None:
+            log.info(f"exec {first.argv[0]}: stream went away, killing pid {proc.pid}")
+            proc.kill()
+
+async def relay(first: pb.ExecInput, requests: AsyncIterator[pb.ExecInput], start) -> AsyncIterator[pb.ExecChunk]:
+    """Pass an ExecStream on to the next hop, a message at a time each way: start(inputs) opens
+    the call there. If our side goes away first, the call is cancelled (killing the process)."""
+    async def inputs():
+        yield first
+        async for msg in requests:
+            yield msg
+
+    call = start(inputs())
+    try:
+        async for chunk in call:
+            yield chunk
+    finally:
+        call.cancel() # no-op if it already finished
@@ -1,2 +1,3 @@
 
-HC_HOME = ".hypercomputer"
\ No newline at end of file
+HC_HOME = ".hypercomputer"
+HC_SHM = "/dev/shm/hypercomputer" # tmpfs home for guest RAM files (hot-fork templates share theirs)
@@ -0,0 +1,51 @@
+# =====================================================
+# common/vsock.py (AF_VSOCK plumbing between hostd and guest agents)
+# =====================================================
+import asyncio, socket
+
+AGENT_PORT = 50053 # guest agent's vsock port (same number as its TCP port)
+COPY_CHUNK = 256 << 10
+
+# grpcio wheels are built without vsock support (binding or dialing "vsock:cid:port" fails),
+# so gRPC runs over a local unix socket on each end and these splice it onto an AF_VSOCK stream.
+
+async def _pump(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while data := await reader.read(COPY_CHUNK):
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof() # pass the half-close on
+    except (ConnectionError, OSError):
+        pass
+
+async def splice(a: tuple, b: tuple):
+    """Copy both ways between two (reader, writer) pairs until both sides are done."""
+    (ra, wa), (rb, wb) = a, b
+    try:
+        await asyncio.gather(_pump(ra, wb), _pump(rb, wa))
+    finally:
+        wa.close()
+        wb.close()
+
+async def open_vsock(cid: int, port: int):
+    s = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
+    s.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(s, (cid, port))
+    except BaseException:
+        s.close()
+        raise
+    return await asyncio.open_connection(sock=s)
+
+async def listen_vsock(port: int, on_conn) -> asyncio.AbstractServer:
+    """asyncio server on vsock `port`, any CID; on_conn(reader, writer) per connection."""
+    s = socket.socket(socket.AF_VSOCK, socket.SOCK_STREAM)
+    try:
+        s.bind((socket.VMADDR_CID_ANY, port))
+        s.listen()
+        s.setblocking(False)
+    except BaseException:
+        s.close()
+        raise
+    return await asyncio.start_server(on_conn, sock=s)
@@ -0,0 +1,146 @@
+# =====================================================
+# controller/autoscaler.py (predictive warm-pool replenisher)
+# =====================================================
+import asyncio, math, time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from proto import api_pb2 as pb
+from common.logs import setup
+
+log = setup("controller.autoscaler")
+
+TICK_SEC = 1.0          # how often each replenisher re-evaluates, absent an acquire waking it
+ALPHA = 0.3             # EWMA weight of the newest sample
+DEFAULT_LATENCY = 2.0   # spawn lead time we assume before we've measured one
+DEFAULT_IDLE_SEC = 300  # no acquires for this long -> shrink back to min
+
+class Policy:
+    def __init__(self, min_warm: int, max_warm: int, headroom: int, idle_sec: int):
+        self.min = min_warm
+        self.max = max(max_warm, min_warm)
+        self.headroom = headroom
+        self.idle_sec = idle_sec or DEFAULT_IDLE_SEC
+
+class Replenisher:
+    """Keeps one pool+shape stocked. It tracks the acquire rate and the spawn latency (both
+    EWMAs) and holds rate * lead time + headroom warm VMs, clamped to [min, max]. Once nobody
+    has acquired for idle_sec it drains back down to min, so idle pools stop holding host RAM."""
+    def __init__(self, ctrl, pool_id: str, shape: pb.Shape, policy: Policy):
+        self.ctrl = ctrl
+        self.pool_id = pool_id
+        self.shape = shape
+        self.key = ctrl.shape_key(shape)
+        self.policy = policy
+        self.rate = 0.0 # acquires/sec
+        self.latency = DEFAULT_LATENCY # sec from asking for a VM to it being warm
+        self.acquires = 0 # since the last tick
+        self.last_acquire = time.monotonic()
+        self.last_tick = time.monotonic()
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def note_acquire(self):
+        self.acquires += 1
+        self.last_acquire = time.monotonic()
+        self.wake.set()
+
+    def note_spawn(self, seconds: float):
+        self.latency = ALPHA * seconds + (1 - ALPHA) * self.latency
+
+    def target(self, now: float) -> int:
+        p = self.policy
+        if now - self.last_acquire >= p.idle_sec:
+            return p.min
+        want = math.ceil(self.rate * (self.latency + TICK_SEC)) + p.headroom
+        return max(p.min, min(p.max, want))
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), TICK_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            now = time.monotonic()
+            dt, self.last_tick = max(now - self.last_tick, 1e-3), now
+            self.rate = ALPHA * (self.acquires / dt) + (1 - ALPHA) * self.rate
+            self.acquires = 0
+            try:
+                await self.step(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"replenisher {self.pool_id}/{self.key}: {e}")
+
+    async def step(self, now: float):
+        pool = self.ctrl.pools.get(self.pool_id)
+        if pool is None:
+            return
+        # Acquires queued on an empty pool count against what's warm
+        depth = len(pool.warm.get(self.key, ())) - sum(not f.done() for f in pool.waiters.get(self.key, ()))
+        target = self.target(now)
+        if depth < target:
+            log.info(f"replenish {self.pool_id}/{self.key}: depth={depth} target={target} rate={self.rate:.2f}/s lead={self.latency:.2f}s")
+            await self.ctrl._spawn_into_pool(pool, self.shape, target - depth, what="Autoscale")
+        elif depth > target and now - self.last_acquire >= self.policy.idle_sec:
+            log.info(f"shrink idle {self.pool_id}/{self.key}: depth={depth} target={target}")
+            async with pool.lock:
+                warm = pool.warm.get(self.key, deque())
+                victims = [warm.pop() for _ in range(min(depth - target, len(warm)))]
+            results = await asyncio.gather(*(self._retire(v) for v in victims), return_exceptions=True)
+            failed = [v for v, r in zip(victims, results) if isinstance(r, Exception)]
+            if failed:
+                # still running: back on the deque, for Acquire or the next shrink
+                async with pool.lock:
+                    for v in failed:
+                        if v in self.ctrl.vms:
+                            self.ctrl._offer_warm(pool, self.key, v)
+
+    async def _retire(self, vm_id: str):
+        vm = self.ctrl.vms.get(vm_id)
+        if vm is None:
+            return # already dropped (destroyed, or its QEMU died)
+        try:
+            await self.ctrl._destroy_vm(vm)
+        except Exception as e:
+            log.error(f"shrink {self.pool_id}/{self.key}: destroying {vm_id} failed: {e}")
+            raise
+
+class Autoscaler:
+    def __init__(self, ctrl):
+        self.ctrl = ctrl
+        self.pools: Dict[Tuple[str, str], Replenisher] = {} # (pool_id, shape_key) -> replenisher
+
+    def configure(self, pool_id: str, shape: pb.Shape, policy: Policy):
+        """Start (or retune) the replenisher for pool+shape; max 0 switches it off."""
+        k = (pool_id, self.ctrl.shape_key(shape))
+        r = self.pools.get(k)
+        if policy.max == 0:
+            if r:
+                r.task.cancel()
+                del self.pools[k]
+            return
+        if r:
+            r.policy = policy
+            r.wake.set()
+            return
+        r = Replenisher(self.ctrl, pool_id, shape, policy)
+        r.task = asyncio.create_task(r.run())
+        self.pools[k] = r
+
+    def disable_pool(self, pool_id: str) -> List[Tuple[str, str]]:
+        keys = [k for k in self.pools if k[0] == pool_id]
+        for k in keys:
+            self.pools.pop(k).task.cancel()
+        return keys
+
+    def note_acquire(self, pool_id: str, key: str):
+        r = self.pools.get((pool_id, key))
+        if r:
+            r.note_acquire()
+
+    def note_spawn(self, pool_id: str, key: str, seconds: float):
+        r = self.pools.get((pool_id, key))
+        if r:
+            r.note_spawn(seconds)
@@ -0,0 +1,185 @@
+# =====================================================
+# controller/journal.py (durable controller state: append-only journal + snapshots)
+# =====================================================
+import asyncio, json, os, pathlib, time
+from typing import Callable, Dict, List
+
+from common.logs import setup
+
+log = setup("controller.journal")
+
+STATE_DIR = pathlib.Path(os.environ.get("HC_CONTROLLER_STATE", ".controller"))
+COMPACT_EVERY = int(os.environ.get("HC_JOURNAL_COMPACT", "100000")) # records replayed at most on recovery
+
+Tables = Dict[str, Dict[str, dict]] # table -> key -> row
+
+class Journal:
+    """Controller state as tables of JSON rows, made durable as a log of put/delete records.
+    Writers call put()/delete() as they change state and await commit() before answering a
+    client; a single flusher task writes whatever has piled up since its last write and fsyncs
+    once, so a burst of spawns costs one fsync, not one each (group commit). Every
+    COMPACT_EVERY records, the full state (dump()) goes to snapshot.json and the journal starts
+    over, so recovery is one snapshot load plus a bounded replay. Compaction doesn't hold up
+    writers: the journal is rotated to journal.old.jsonl and new records go to a fresh file
+    while the snapshot is written in the background; the old file goes once it's on disk."""
+    def __init__(self, root: pathlib.Path = STATE_DIR, dump: Callable[[], Tables] = None):
+        self.root = root
+        self.path = root / "journal.jsonl"
+        self.old = root / "journal.old.jsonl" # rotated out, until the snapshot covering it is on disk
+        self.snap = root / "snapshot.json"
+        self.dump = dump
+        self.seq = 0    # last record handed to us
+        self.synced = 0 # last record on disk
+        self.pending: List[str] = []
+        self.waiters: List[asyncio.Future] = []
+        self.since_snapshot = 0
+        self.wake = asyncio.Event()
+        self.f = None
+        self.task = None
+        self.compacting = None
+
+    def put(self, table: str, key: str, row: dict):
+        self._record({"op": "put", "t": table, "k": key, "v": row})
+
+    def delete(self, table: str, keys: List[str]):
+        if keys:
+            self._record({"op": "del", "t": table, "k": list(keys)})
+
+    def _record(self, rec: dict):
+        self.seq += 1
+        rec["s"] = self.seq
+        self.pending.append(json.dumps(rec, separators=(",", ":")))
+        self.wake.set()
+
+    async def commit(self):
+        """Wait until everything recorded so far is on disk."""
+        if self.synced >= self.seq or self.task is None:
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.wake.set()
+        await fut
+
+    def load(self) -> Tables:
+        """Read back the state as of the last record that made it to disk."""
+        t0 = time.monotonic()
+        self.root.mkdir(parents=True, exist_ok=True)
+        tables: Tables = {}
+        if self.snap.exists():
+            with open(self.snap) as f:
+                snap = json.load(f)
+            tables, self.seq = snap["tables"], snap["seq"]
+        replayed = self._replay(self.old, tables) + self._replay(self.path, tables)
+        if self.old.exists():
+            # crashed mid-compaction: finish it now, from what we just read
+            self._write_snapshot(self.seq, tables)
+            os.truncate(self.path, 0)
+            replayed = 0
+        self.synced = self.seq
+        self.since_snapshot = replayed
+        log.info(f"loaded state: {', '.join(f'{len(r)} {t}' for t, r in tables.items()) or 'empty'}, "
+                 f"{replayed} journal records replayed in {time.monotonic() - t0:.2f}s")
+        return tables
+
+    def _replay(self, path: pathlib.Path, tables: Tables) -> int:
+        if not path.exists():
+            return 0
+        replayed, good = 0, 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break # torn write from a crash: everything after it never committed
+                good += len(line)
+                if rec["s"] <= self.seq:
+                    continue # already in the snapshot
+                rows = tables.setdefault(rec["t"], {})
+                if rec["op"] == "put":
+                    rows[rec["k"]] = rec["v"]
+                else:
+                    for k in rec["k"]:
+                        rows.pop(k, None)
+                self.seq = rec["s"]
+                replayed += 1
+        os.truncate(path, good)
+        return replayed
+
+    def start(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.f = open(self.path, "ab")
+        self.task = asyncio.create_task(self.run())
+
+    def _append(self, lines: List[str]):
+        self.f.write(("\n".join(lines) + "\n").encode())
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def _sync_dir(self):
+        dfd = os.open(self.root, os.O_RDONLY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+
+    def _rotate(self):
+        self.f.close()
+        os.rename(self.path, self.old)
+        self.f = open(self.path, "ab")
+        self._sync_dir()
+
+    def _write_snapshot(self, seq: int, tables: Tables):
+        tmp = self.snap.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"seq": seq, "tables": tables}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp, self.snap)
+        self._sync_dir()
+        if self.old.exists():
+            os.unlink(self.old) # everything in it is now in the snapshot
+
+    async def _compact(self, seq: int, tables: Tables):
+        t0 = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, seq, tables)
+            log.info(f"snapshot at record {seq}: {', '.join(f'{len(r)} {t}' for t, r in tables.items())} "
+                     f"in {time.monotonic() - t0:.2f}s")
+        except OSError as e:
+            log.error(f"snapshot failed: {e}")
+        finally:
+            self.compacting = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            lines, self.pending = self.pending, []
+            waiters, self.waiters = self.waiters, []
+            seq = self.seq
+            try:
+                if lines:
+                    await loop.run_in_executor(None, self._append, lines)
+            except OSError as e:
+                log.error(f"journal write failed: {e}")
+                for w in waiters:
+                    if not w.done():
+                        w.set_exception(e)
+                continue
+            self.synced = seq
+            for w in waiters:
+                if not w.done():
+                    w.set_result(None)
+            self.since_snapshot += len(lines)
+            if self.since_snapshot >= COMPACT_EVERY and self.dump and self.compacting is None:
+                # state as of record seq, taken between two event-loop steps; records still in
+                # self.pending are <= seq too and land in the new file, where replay skips them
+                tables, seq = self.dump(), self.seq
+                try:
+                    await loop.run_in_executor(None, self._rotate)
+                except OSError as e:
+                    log.error(f"journal rotate failed: {e}")
+                    continue
+                self.since_snapshot = 0
+                self.compacting = asyncio.create_task(self._compact(seq, tables))
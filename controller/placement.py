@@ -0,0 +1,158 @@
+# =====================================================
+# controller/placement.py (host capacity + placement)
+# =====================================================
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from proto import api_pb2 as pb
+
+CPU_OVERCOMMIT = 4.0 # vcpus we'll commit per host cpu
+MEM_OVERCOMMIT = 1.0 # guest RAM we'll commit per byte of host RAM (KSM/hot-fork sharing not counted)
+NO_GPU = "0000:00:00.0"
+
+SPREAD = "spread"   # put each VM on the host with the most free memory
+BINPACK = "binpack" # put each VM on the fullest host it still fits on
+
+class Slot:
+    """Resources committed on one host for one (future) VM."""
+    def __init__(self, host: str, vcpu: int, mem: int, bdf: str, numa: int):
+        self.host = host
+        self.vcpu = vcpu
+        self.mem = mem
+        self.bdf = bdf
+        self.numa = numa
+
+class HostCapacity:
+    def __init__(self, name: str, inv: pb.InventoryResp):
+        self.name = name
+        self.cpus = int(inv.cpus * CPU_OVERCOMMIT)
+        self.mem = int(inv.mem_bytes * MEM_OVERCOMMIT)
+        numa = list(inv.gpus_numa) + [0] * (len(inv.gpus_bdf) - len(inv.gpus_numa))
+        self.gpu_numa: Dict[str, int] = dict(zip(inv.gpus_bdf, numa))
+        self.gpu_users: Dict[str, int] = {bdf: 0 for bdf in inv.gpus_bdf}
+        self.numa_vcpus: Dict[int, int] = {n: 0 for n in numa} # vcpus committed next to each node's GPUs
+        self.used_cpus = 0
+        self.used_mem = 0
+        self.shared_storage = inv.shared_storage
+
+    @property
+    def free_mem(self) -> int:
+        return self.mem - self.used_mem
+
+    def fits(self, vcpu: int, mem: int, gpu: bool = False) -> bool:
+        if gpu and not self.gpu_users:
+            return False # a GPU shape needs a host with GPUs to share
+        return self.used_cpus + vcpu <= self.cpus and self.used_mem + mem <= self.mem
+
+    def pick_gpu(self) -> Tuple[str, int]:
+        # least-shared GPU, tie-broken toward the NUMA node with the fewest vcpus pinned near it
+        if not self.gpu_users:
+            return NO_GPU, -1
+        bdf = min(self.gpu_users, key=lambda b: (self.gpu_users[b], self.numa_vcpus[self.gpu_numa[b]], b))
+        return bdf, self.gpu_numa[bdf]
+
+class Placement:
+    """Tracks what each host has (InventoryResp) and what is already committed to VMs, and
+    picks hosts for new ones. Hosts are kept sorted by free memory, so choosing one is a
+    bisect (binpack) or a look at the end of the list (spread) rather than a walk over every host.
+    Only memory is indexed: hosts that have the memory but not the cpus, GPUs or shared storage
+    a request needs are stepped past one by one (with cpus overcommitted CPU_OVERCOMMIT times,
+    memory is what runs out first)."""
+    def __init__(self, policy: str = SPREAD):
+        self.policy = policy
+        self.hosts: Dict[str, HostCapacity] = {}
+        self._order: List[Tuple[int, str]] = [] # (free_mem, host), ascending
+        self.slots: Dict[str, Slot] = {} # vm_id -> what it holds
+
+    def add_host(self, name: str, inv: pb.InventoryResp):
+        if name in self.hosts:
+            self._unindex(self.hosts[name])
+        h = HostCapacity(name, inv)
+        self.hosts[name] = h
+        bisect.insort(self._order, (h.free_mem, name))
+
+    def remove_host(self, name: str):
+        h = self.hosts.pop(name, None)
+        if h:
+            self._unindex(h)
+
+    def _unindex(self, h: HostCapacity):
+        i = bisect.bisect_left(self._order, (h.free_mem, h.name))
+        if i < len(self._order) and self._order[i] == (h.free_mem, h.name):
+            self._order.pop(i)
+
+    def _commit(self, h: HostCapacity, vcpu: int, mem: int, sign: int):
+        self._unindex(h)
+        h.used_cpus += sign * vcpu
+        h.used_mem += sign * mem
+        bisect.insort(self._order, (h.free_mem, h.name))
+
+    def _candidate(self, vcpu: int, mem: int, gpu: bool = False, shared: bool = False) -> Optional[HostCapacity]:
+        if self.policy == BINPACK:
+            # smallest free memory that still fits; move up past hosts that are short on cpu
+            i = bisect.bisect_left(self._order, (mem, ""))
+            rng = range(i, len(self._order))
+        else:
+            rng = range(len(self._order) - 1, -1, -1)
+        for j in rng:
+            h = self.hosts[self._order[j][1]]
+            if shared and not h.shared_storage:
+                continue
+            if h.fits(vcpu, mem, gpu):
+                return h
+            if self.policy != BINPACK and h.free_mem < mem:
+                return None # descending by free memory: nothing further down fits either
+        return None
+
+    def place(self, shape: pb.Shape, prefer: str = None, only: str = None, shared: bool = False) -> Optional[Slot]:
+        """Commit room for one VM of `shape` and return where, or None if nothing fits.
+        `prefer` is tried first; `only` restricts placement to that host, `shared` to hosts
+        whose HC_HOME is shared storage."""
+        vcpu, mem, gpu = shape.vcpu, shape.ram_gb << 30, bool(shape.gpu_model)
+        h = None
+        for name in (only, prefer):
+            if name and name in self.hosts and self.hosts[name].fits(vcpu, mem, gpu):
+                h = self.hosts[name]
+                break
+        if h is None and not only:
+            h = self._candidate(vcpu, mem, gpu, shared)
+        if h is None:
+            return None
+
+        bdf, numa = h.pick_gpu() if gpu else (NO_GPU, -1)
+        if numa >= 0:
+            h.gpu_users[bdf] += 1
+            h.numa_vcpus[numa] += vcpu
+        self._commit(h, vcpu, mem, +1)
+        return Slot(h.name, vcpu, mem, bdf, numa)
+
+    def free(self, slot: Slot):
+        """Give back a slot that never became a VM (or whose VM is gone)."""
+        h = self.hosts.get(slot.host)
+        if not h:
+            return
+        if slot.numa >= 0:
+            h.gpu_users[slot.bdf] -= 1
+            h.numa_vcpus[slot.numa] -= slot.vcpu
+        self._commit(h, slot.vcpu, slot.mem, -1)
+
+    def assign(self, vm_id: str, slot: Slot):
+        self.slots[vm_id] = slot
+
+    def restore(self, vm_id: str, host: str, shape: pb.Shape, bdf: str) -> Optional[Slot]:
+        """Commit again what an existing VM holds (controller recovery)."""
+        h = self.hosts.get(host)
+        if not h:
+            return None
+        numa = h.gpu_numa.get(bdf, -1) if shape.gpu_model else -1
+        if numa >= 0:
+            h.gpu_users[bdf] += 1
+            h.numa_vcpus[numa] += shape.vcpu
+        self._commit(h, shape.vcpu, shape.ram_gb << 30, +1)
+        slot = self.slots[vm_id] = Slot(h.name, shape.vcpu, shape.ram_gb << 30, bdf, numa)
+        return slot
+
+    def release(self, vm_id: str):
+        slot = self.slots.pop(vm_id, None)
+        if slot:
+            self.free(slot)
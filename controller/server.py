@@ -1,10 +1,12 @@
 # =====================================================
 # controller/server.py (grpc.aio)
 # =====================================================
-import asyncio
+import asyncio, os, time
 from typing import Dict, List, Deque, Optional
 import grpc
+from google.protobuf import json_format
 
+from contextlib import aclosing
 from dataclasses import dataclass, field
 from collections import deque
 
@@ -13,9 +15,29 @@ from proto import api_pb2_grpc as rpc
 
 from common.logs import setup
 from common.ids import new_id
+from common.streams import relay
+from common import metrics
+from common.metrics import SPAWN_FAILURES, rpc_timers
+from placement import Placement
+from autoscaler import Autoscaler, Policy
+from journal import Journal, Tables
 
 log = setup("controller")
 
+DEFAULT_FANOUT = 8 # max QEMUs starting at once per hostd when a request doesn't say
+MAP_PARALLEL = 16 # max MapExec Execs in flight per hostd when a request doesn't say
+HOST_POLL_SEC = 5.0 # how often each hostd is asked for VMs that died on their own
+METRICS_PORT = int(os.environ.get("HC_CONTROLLER_METRICS_PORT", "9151"))
+# HC_HOME is shared storage, mounted at the same path on every host that also reports so in
+# its inventory: only then may cold-fork children be placed away from their parent
+SHARED_STORAGE = os.environ.get("HC_SHARED_STORAGE", "") == "1"
+
+# read off the pools' warm deques at scrape time (serve() points it at the controller)
+WARM = metrics.Gauge("hc_warm_vms", "Paused VMs ready to hand out, per pool and shape.", ["pool", "shape"])
+
+def hostd_channel(addr: str) -> grpc.aio.Channel:
+    return grpc.aio.insecure_channel(addr, interceptors=rpc_timers()) # round trips go to hc_rpc_seconds
+
 class HostInfo:
     def __init__(self, addr: str, inv: pb.InventoryResp, client: 'rpc.HostdAPIStub'):
         self.addr = addr
@@ -23,7 +45,7 @@ class HostInfo:
         self.client = client
 
 class VM:
-    def __init__(self, vm_id: str, host: str, shape: pb.Shape, gpu_bdf: str, ip: str = "", pool: str = ""):
+    def __init__(self, vm_id: str, host: str, shape: pb.Shape, gpu_bdf: str, ip: str = "", pool: str = "", parent: str = ""):
         self.id = vm_id
         self.host = host
         self.shape = shape
@@ -31,6 +53,7 @@ class VM:
         self.ip = ip
         self.state = "PAUSED_WARM"
         self.pool = pool
+        self.parent = parent # VM this one was forked from
 
 @dataclass
 class PoolState:
@@ -39,15 +62,77 @@ class PoolState:
     tenant_id: str
     guests: List[str] = field(default_factory=list) # host names (inv.host)
     warm: Dict[str, Deque[str]] = field(default_factory=dict) # shape_key -> deque of vm_ids
+    waiters: Dict[str, Deque[asyncio.Future]] = field(default_factory=dict) # shape_key -> Acquires queued for a VM, FIFO
     lock: asyncio.Lock = field(default_factory=asyncio.Lock) # per-pool lock
 
 class Controller(rpc.ControllerAPIServicer):
     def __init__(self):
         self.hosts: Dict[str, HostInfo] = {}
         self.vms: Dict[str, VM] = {}
-        self.warm: Dict[str, List[str]] = {}
-        self._lock = asyncio.Lock()
         self.pools: Dict[str, PoolState] = {}
+        self.placement = Placement()
+        self.autoscaler = Autoscaler(self)
+        self.journal = Journal(dump=self._tables)
+        self.watcher: Optional[asyncio.Task] = None # watch_hosts
+
+    def add_host(self, addr: str, inv: pb.InventoryResp, client: 'rpc.HostdAPIStub'):
+        inv.ClearField("exited_vms") # news for watch_hosts, not part of what the host has
+        self.hosts[inv.host] = HostInfo(addr=addr, inv=inv, client=client)
+        self.placement.add_host(inv.host, inv)
+        self.journal.put("hosts", inv.host, {"addr": addr, "inv": json_format.MessageToDict(inv)})
+
+    # --- persistence: every state change is a journal row (journal.py); restore() rebuilds ---
+    @staticmethod
+    def _vm_row(vm: VM) -> dict:
+        return {"host": vm.host, "shape": [vm.shape.vcpu, vm.shape.ram_gb, vm.shape.gpu_model], "gpu_bdf": vm.gpu_bdf,
+                "ip": vm.ip, "state": vm.state, "pool": vm.pool, "parent": vm.parent}
+
+    def _save_vm(self, vm: VM):
+        self.journal.put("vms", vm.id, self._vm_row(vm))
+
+    def _autoscale_row(self, pool_id: str, shape: pb.Shape, policy: Policy) -> dict:
+        return {"pool_id": pool_id, "shape": [shape.vcpu, shape.ram_gb, shape.gpu_model], "min": policy.min,
+                "max": policy.max, "headroom": policy.headroom, "idle_sec": policy.idle_sec}
+
+    def _tables(self) -> Tables:
+        return {
+            "hosts": {n: {"addr": h.addr, "inv": json_format.MessageToDict(h.inv)} for n, h in self.hosts.items()},
+            "pools": {p.id: {"name": p.name, "tenant_id": p.tenant_id} for p in self.pools.values()},
+            "vms": {vm.id: self._vm_row(vm) for vm in self.vms.values()},
+            "autoscale": {f"{pid}/{key}": self._autoscale_row(pid, r.shape, r.policy)
+                          for (pid, key), r in self.autoscaler.pools.items()},
+        }
+
+    def restore(self, tables: Tables):
+        """Rebuild from journal.load(): hosts (channels connect on first use), pools, VMs and
+        the indexes over them -- pool membership, warm deques per shape, placement per host --
+        then restart the replenishers."""
+        for name, row in tables.get("hosts", {}).items():
+            inv = json_format.ParseDict(row["inv"], pb.InventoryResp())
+            self.hosts[name] = HostInfo(addr=row["addr"], inv=inv, client=rpc.HostdAPIStub(hostd_channel(row["addr"])))
+            self.placement.add_host(name, inv)
+        for pool_id, row in tables.get("pools", {}).items():
+            self.pools[pool_id] = PoolState(id=pool_id, name=row["name"], tenant_id=row["tenant_id"])
+        shapes: Dict[tuple, tuple] = {} # VMs share Shape objects (and keys) instead of one each
+        for vm_id, row in tables.get("vms", {}).items():
+            t = tuple(row["shape"])
+            if t not in shapes:
+                s = pb.Shape(vcpu=t[0], ram_gb=t[1], gpu_model=t[2])
+                shapes[t] = (s, self.shape_key(s))
+            shape, key = shapes[t]
+            vm = VM(vm_id, row["host"], shape, row["gpu_bdf"], ip=row["ip"], pool=row["pool"], parent=row["parent"])
+            vm.state = row["state"]
+            self.vms[vm_id] = vm
+            self.placement.restore(vm_id, vm.host, shape, vm.gpu_bdf)
+            pool = self.pools.get(vm.pool)
+            if pool:
+                pool.guests.append(vm_id)
+                if vm.state == "PAUSED_WARM":
+                    pool.warm.setdefault(key, deque()).append(vm_id)
+        for row in tables.get("autoscale", {}).values():
+            shape = pb.Shape(vcpu=row["shape"][0], ram_gb=row["shape"][1], gpu_model=row["shape"][2])
+            self.autoscaler.configure(row["pool_id"], shape, Policy(row["min"], row["max"], row["headroom"], row["idle_sec"]))
+        log.info(f"restored {len(self.hosts)} hosts, {len(self.pools)} pools, {len(self.vms)} VMs")
 
     @staticmethod
     def shape_key(s: pb.Shape) -> str:
@@ -65,6 +150,8 @@ class Controller(rpc.ControllerAPIServicer):
         spec = request.spec
         p = PoolState(id=pool_id, name=spec.name or pool_id, tenant_id=spec.tenant_id or "default")
         self.pools[pool_id] = p
+        self.journal.put("pools", p.id, {"name": p.name, "tenant_id": p.tenant_id})
+        await self.journal.commit()
         return pb.CreatePoolResp(pool=pb.Pool(id=p.id, name=p.name, tenant_id=p.tenant_id, hosts=list(p.guests)))
 
     async def ListPools(self, request: pb.Empty, context) -> pb.ListPoolsResp:
@@ -77,6 +164,131 @@ class Controller(rpc.ControllerAPIServicer):
         items = pool.guests
         return pb.ListPoolsHostsResp(hosts=items)
 
+    async def _spawn_many(self, jobs: List[tuple], fanout: int = 0) -> List[tuple]:
+        """Spawn every (host_name, HostSpawnWarmReq) in jobs. Jobs are grouped into one
+        SpawnWarmBatch stream per host (jobs for a host must share shape and snapshot), with at
+        most `fanout` QEMUs starting at once on each host. Returns (index, host_name, req, resp, err)
+        in job order; exactly one of resp/err is set."""
+        width = fanout or DEFAULT_FANOUT
+        by_host: Dict[str, List[int]] = {}
+        for i, (host_name, _) in enumerate(jobs):
+            by_host.setdefault(host_name, []).append(i)
+        results: List[Optional[tuple]] = [None] * len(jobs)
+
+        async def one_host(host_name: str, idxs: List[int]):
+            first = jobs[idxs[0]][1]
+            req = pb.HostSpawnWarmBatchReq(shape=first.shape, snapshot=first.snapshot, count=len(idxs),
+                                           gpu_bdfs=[jobs[i][1].gpu_bdf for i in idxs], parallel=width)
+            err = None
+            try:
+                async for resp in self.hosts[host_name].client.SpawnWarmBatch(req):
+                    i = idxs[resp.index]
+                    if resp.error:
+                        results[i] = (i, host_name, jobs[i][1], None, RuntimeError(resp.error))
+                    else:
+                        results[i] = (i, host_name, jobs[i][1], resp, None)
+            except Exception as e:
+                err = e
+            for i in idxs:
+                if results[i] is None:
+                    results[i] = (i, host_name, jobs[i][1], None, err or RuntimeError("no result from hostd"))
+
+        await asyncio.gather(*(one_host(h, idxs) for h, idxs in by_host.items()))
+        return results
+
+    async def _spawn_into_pool(self, pool: PoolState, shape: pb.Shape, n: int, snapshot: Dict[str, str] = {},
+                               fanout: int = 0, prefer: str = None, only: str = None, shared: bool = False,
+                               parent: str = "", what: str = "spawn"):
+        """Place n VMs of `shape`, spawn them, and add the ones that come up to the pool's warm
+        list. Returns (vm_ids, [SpawnError])."""
+        key = self.shape_key(shape)
+        t0 = time.monotonic()
+        jobs, slots, errors = [], [], []
+        for i in range(n):
+            slot = self.placement.place(shape, prefer=prefer, only=only, shared=shared)
+            if slot is None:
+                SPAWN_FAILURES.labels(what, "no_capacity").inc()
+                errors.append(pb.SpawnError(index=i, host=only or "", error="no host has capacity"))
+                continue
+            jobs.append((slot.host, pb.HostSpawnWarmReq(shape=shape, snapshot=snapshot, gpu_bdf=slot.bdf)))
+            slots.append((i, slot))
+
+        vm_ids = []
+        for j, host_name, req, resp, err in await self._spawn_many(jobs, fanout):
+            i, slot = slots[j]
+            if err:
+                log.error(f"{what} -- SpawnWarm on {host_name} failed: {err}")
+                SPAWN_FAILURES.labels(what, "hostd").inc()
+                errors.append(pb.SpawnError(index=i, host=host_name, error=str(err)))
+                self.placement.free(slot)
+                continue
+            vm = VM(resp.vm_id, host=host_name, shape=shape, gpu_bdf=req.gpu_bdf, pool=pool.id, parent=parent)
+            log.info(f"VM Info: {resp.vm_id}")
+            self.placement.assign(vm.id, slot)
+            async with pool.lock:
+                self.vms[vm.id] = vm
+                self._offer_warm(pool, key, vm.id)
+            pool.guests.append(vm.id)
+            self._save_vm(vm)
+            vm_ids.append(vm.id)
+        await self.journal.commit() # one fsync for the whole batch
+        if vm_ids:
+            self.autoscaler.note_spawn(pool.id, key, time.monotonic() - t0)
+        errors.sort(key=lambda e: e.index)
+        return vm_ids, errors
+
+    async def _destroy_vm(self, vm: VM):
+        h = self.hosts[vm.host]
+        await h.client.Destroy(pb.VMId(vm_id=vm.id))
+        self._forget_vms([vm])
+
+    def _forget_vms(self, vms: List[VM]):
+        # bookkeeping for destroyed VMs: capacity back, out of their pool (warm deques included)
+        gone = {vm.id for vm in vms}
+        for vm in vms:
+            vm.state = "DESTROYED"
+            self.placement.release(vm.id)
+            self.vms.pop(vm.id, None)
+        self.journal.delete("vms", gone)
+        for pool_id in {vm.pool for vm in vms}:
+            pool = self.pools.get(pool_id)
+            if pool:
+                pool.guests[:] = [v for v in pool.guests if v not in gone]
+        self._unwarm(vms)
+
+    def _gone(self, host: str, vm_ids) -> List[VM]:
+        # hostd reaped these after their QEMU died: drop them like destroyed ones
+        vms = [self.vms[v] for v in vm_ids if v in self.vms]
+        if vms:
+            log.error(f"{host}: {len(vms)} VMs exited on their own, dropping them: {[vm.id for vm in vms]}")
+            self._forget_vms(vms)
+        return vms
+
+    async def watch_hosts(self):
+        """Poll every hostd's inventory for VMs it reaped (exited_vms), so they leave their
+        pools and warm deques instead of being handed out."""
+        while True:
+            await asyncio.sleep(HOST_POLL_SEC)
+            for h in list(self.hosts.values()):
+                try:
+                    inv = await h.client.ReportInventory(pb.Empty())
+                except grpc.aio.AioRpcError as e:
+                    log.error(f"{h.inv.host}: inventory failed: {e.code().name}")
+                    continue
+                if self._gone(h.inv.host, inv.exited_vms):
+                    await self.journal.commit()
+
+    def _unwarm(self, vms: List[VM]):
+        # take vms off their pools' warm deques (Acquire can't hand them out any more)
+        gone = {vm.id for vm in vms}
+        for pool_id in {vm.pool for vm in vms}:
+            pool = self.pools.get(pool_id)
+            if not pool:
+                continue
+            for key, warm in pool.warm.items():
+                if any(v in gone for v in warm):
+                    pool.warm[key] = deque(v for v in warm if v not in gone)
+
     async def EnsureWarmPool(self, request: pb.EnsureWarmPoolReq, context) -> pb.EnsureWarmPoolResp:
         pool = self._get_pool(request.pool_id, context)
         key = self.shape_key(request.shape)
@@ -87,112 +299,172 @@ class Controller(rpc.ControllerAPIServicer):
         # if need <= 0:
         #     return pb.EnsureWarmPoolResp(current=cur)
 
-        # naive spread: first host only (MVP)
-        for host_name, h in self.hosts.items():
-            for i in range(need):
-                bdf = h.inv.gpus_bdf[i % max(1, len(h.inv.gpus_bdf))] if h.inv.gpus_bdf else "0000:00:00.0"
-                try:
-                    resp = await h.client.SpawnWarm(pb.HostSpawnWarmReq(shape=request.shape, gpu_bdf=bdf))
-                except Exception as e:
-                    log.error(f"EnsureWarmPool -- SpawnWarm on {host_name} failed: {e}")
-                    continue
-                vm = VM(resp.vm_id, host=h.inv.host, shape=request.shape, gpu_bdf=bdf, pool=pool.id)
-                log.info(f"VM Info: {resp.vm_id}")
-                async with pool.lock:
-                    self.vms[vm.id] = vm
-                    pool.warm.setdefault(key, deque()).append(vm.id)
-                cur += 1
-                pool.guests.append(vm.id)
-                if cur >= request.target:
-                    return pb.EnsureWarmPoolResp(current=cur)
-        return pb.EnsureWarmPoolResp(current=cur)
-
-    async def Fork(self, request: pb.EnsureWarmPoolReq, context) -> pb.EnsureWarmPoolResp:
+        vm_ids, errors = await self._spawn_into_pool(pool, request.shape, need, fanout=request.fanout, what="EnsureWarmPool")
+        cur += len(vm_ids)
+        return pb.EnsureWarmPoolResp(current=cur, vm_ids=vm_ids, errors=errors)
+
+    async def SetAutoscale(self, request: pb.AutoscaleReq, context) -> pb.Empty:
+        self._get_pool(request.pool_id, context)
+        policy = Policy(request.min, request.max, request.headroom, request.idle_sec)
+        self.autoscaler.configure(request.pool_id, request.shape, policy)
+        key = f"{request.pool_id}/{self.shape_key(request.shape)}"
+        if request.max == 0:
+            self.journal.delete("autoscale", [key])
+        else:
+            self.journal.put("autoscale", key, self._autoscale_row(request.pool_id, request.shape, policy))
+        await self.journal.commit()
+        return pb.Empty()
+
+    async def Fork(self, request: pb.ForkReq, context) -> pb.ForkResp:
         vm_id = request.vm_id
-        vm = self.vms[vm_id]
-        h = self.hosts[vm.host]
+        parent = self.vms[vm_id]
+        h = self.hosts[parent.host]
 
-        pool_id = vm.pool
+        pool_id = parent.pool
 
         pool = self._get_pool(pool_id, context)
-        key = self.shape_key(vm.shape)
-        async with pool.lock:
-            cur = len(pool.warm.get(key, deque()))
+        key = self.shape_key(parent.shape)
         # TODO: Someday we will want to fork into another pool. That could be easy to do here. 
 
-        need = request.how_many #- cur
-        # if need <= 0:
-        #     return pb.EnsureWarmPoolResp(current=cur)
+        need = request.how_many
 
-        r = await h.client.GetOverlays(pb.OverlayReq(vm_id=request.vm_id))
+        if request.cold_fork:
+            r = await h.client.GetOverlays(pb.OverlayReq(vm_id=request.vm_id))
+        else:
+            # hot fork: the parent freezes into a template and children resume from its RAM +
+            # device state instead of booting; it can't be handed out any more
+            r = await h.client.PrepareHotFork(pb.OverlayReq(vm_id=request.vm_id))
+            parent.state = "TEMPLATE"
+            self._save_vm(parent)
+            async with pool.lock:
+                warm = pool.warm.get(key, deque())
+                if parent.id in warm:
+                    warm.remove(parent.id)
         # overlays = {}
         overlays = dict(r.overlays)
 
         log.info(f'Fork -- overlays={type(dict(overlays))} overlays={dict(overlays)}')
         # 1. get overlays from source vm call here
-        #   - on hostd: pause vm, get overlays, unpause vm
-        # 2. give overlay to SpawnWarm
+        #   - on hostd: pause vm, get overlays, unpause vm (hot fork: pause for good, save device state)
+        # 2. give overlay to SpawnWarm, fanned out `request.fanout` wide
         #   - on hostd: get overlays, feed overlays into start_qemu()
-        # 3. Return lists
-
-        # naive spread: first host only (MVP)
-        # for host_name, h in self.hosts.items():
-            # eventually this will have to 'find' empty-enough hostd capacity, and get those rather than 
-            # iterate through the list of hosts
-            # the below 
-
-        host_name = [self.hosts.keys()][0]
-        child_vms = list()
-        for i in range(need):
-            bdf = h.inv.gpus_bdf[i % max(1, len(h.inv.gpus_bdf))] if h.inv.gpus_bdf else "0000:00:00.0"
-            # log.info(f'fork -- {vm.shape}')
-            try:
-                resp = await h.client.SpawnWarm(pb.HostSpawnWarmReq(shape=vm.shape, snapshot=overlays, gpu_bdf=bdf))
-            except Exception as e:
-                log.error(f"Fork -- SpawnWarm on {host_name} failed: {e}")
-                continue
-            vm = VM(resp.vm_id, host=h.inv.host, shape=vm.shape, gpu_bdf=bdf)
-            log.info(f"VM Info: {resp.vm_id}")
-            async with pool.lock:
-                self.vms[vm.id] = vm
-                pool.warm.setdefault(key, deque()).append(vm.id)
-            cur += 1
-            pool.guests.append(vm.id)
-            child_vms.append(vm.id)
-            # if cur >= request.target:
-            #     return pb.ForkResp(vm_ids=child_vms)
-        return pb.ForkResp(vm_ids=child_vms)
+        # 3. Return lists, plus whatever children failed
+
+        # children go next to the parent: its overlays (and for a hot fork, its RAM) are files on
+        # that host, under paths only it has. Unpinned cold-fork children may spill to other
+        # hosts when it's full only if HC_HOME is shared storage there and on the parent's host
+        # (SHARED_STORAGE plus the hosts' inventories). Note a spilled child doesn't hold the
+        # parent's fork point in the parent host's hostd, which may collect the layer once the
+        # parent is gone.
+        spill = (request.cold_fork and not request.pinned and SHARED_STORAGE
+                 and self.hosts[parent.host].inv.shared_storage)
+        only = None if spill else parent.host
+        child_vms, errors = await self._spawn_into_pool(pool, parent.shape, need, snapshot=overlays, fanout=request.fanout,
+                                                        prefer=parent.host, only=only, shared=spill, parent=parent.id, what="Fork")
+        return pb.ForkResp(vm_ids=child_vms, errors=errors)
+
+    def warm_depths(self):
+        for p in self.pools.values():
+            for key, warm in p.warm.items():
+                yield (p.id, key), len(warm)
+
+    def _offer_warm(self, pool: PoolState, key: str, vm_id: str):
+        # caller holds pool.lock. The longest-waiting Acquire gets the VM, else it goes on the deque
+        vm = self.vms.get(vm_id)
+        if vm and vm.state == "TEMPLATE":
+            return # never handed out: running it would corrupt its hot-fork children
+        waiters = pool.waiters.get(key)
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(vm_id)
+                return
+        pool.warm.setdefault(key, deque()).append(vm_id)
+
+    def _pool_for_acquire(self, pool_id: str, key: str, context) -> PoolState:
+        if pool_id:
+            return self._get_pool(pool_id, context)
+        # no pool given: any pool that has one ready right now (walks the pools)
+        for p in self.pools.values():
+            if p.warm.get(key):
+                return p
+        return None
 
     async def Acquire(self, request: pb.AcquireReq, context) -> pb.AcquireResp:
-        #TODO Need to adapt Pools for this method
         key = self.shape_key(request.shape)
-        async with self._lock:
-            ids = self.warm.get(key, [])
-            if not ids:
-                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "no warm VMs; add fallback later")
-            vm_id = ids.pop(0)
+        pool = self._pool_for_acquire(request.pool_id, key, context)
+        if pool is None:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "no warm VMs")
+        self.autoscaler.note_acquire(pool.id, key)
+
+        wait = request.wait_ms / 1000.0
+        remaining = context.time_remaining()
+        if remaining is not None:
+            wait = min(wait, remaining)
+        fut = None
+        async with pool.lock:
+            warm = pool.warm.get(key)
+            waiters = pool.waiters.setdefault(key, deque())
+            if warm and not waiters:
+                vm_id = warm.popleft()
+            elif wait > 0:
+                fut = asyncio.get_running_loop().create_future()
+                waiters.append(fut)
+            else:
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "no warm VMs")
+
+        if fut is not None:
+            try:
+                vm_id = await asyncio.wait_for(fut, wait)
+            except asyncio.TimeoutError:
+                await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"no warm VM within {request.wait_ms}ms")
+            except asyncio.CancelledError:
+                # client went away; if a VM was handed to us in the meantime, give it back
+                if fut.done() and not fut.cancelled():
+                    async with pool.lock:
+                        self._offer_warm(pool, key, fut.result())
+                raise
+
+        while True:
             vm = self.vms[vm_id]
-        h = self.hosts[vm.host]
-        await h.client.Unpause(pb.VMId(vm_id=vm.id))
+            h = self.hosts[vm.host]
+            try:
+                await h.client.Unpause(pb.VMId(vm_id=vm.id))
+                break
+            except grpc.aio.AioRpcError as e:
+                if e.code() != grpc.StatusCode.NOT_FOUND:
+                    raise
+            # its QEMU died and hostd reaped it before watch_hosts heard: drop it, try the next
+            self._gone(vm.host, [vm.id])
+            async with pool.lock:
+                warm = pool.warm.get(key)
+                if not warm:
+                    await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "no warm VMs")
+                vm_id = warm.popleft()
         vm.state = "RUNNING"
+        self._save_vm(vm)
+        await self.journal.commit()
         handle = pb.VMHandle(vm_id=vm.id, host=vm.host, ip=vm.ip, ssh_key_ref="devbox-default")
         return pb.AcquireResp(vm=handle)
 
     async def Release(self, request: pb.ReleaseReq, context) -> pb.Empty:
-        #TODO Need to adapt Pools for this method
         vm = self.vms.get(request.vm_id)
         if not vm:
             return pb.Empty()
         h = self.hosts[vm.host]
         if request.recycle:
+            if vm.state == "TEMPLATE":
+                await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "vm is a hot-fork template")
             await h.client.Pause(pb.VMId(vm_id=vm.id))
             vm.state = "PAUSED_WARM"
-            key = self.shape_key(vm.shape)
-            async with self._lock:
-                self.warm.setdefault(key, []).append(vm.id)
+            self._save_vm(vm)
+            pool = self.pools.get(vm.pool)
+            if pool:
+                async with pool.lock:
+                    self._offer_warm(pool, self.shape_key(vm.shape), vm.id)
         else:
-            await h.client.Destroy(pb.VMId(vm_id=vm.id))
-            vm.state = "DESTROYED"
+            await self._destroy_vm(vm)
+        await self.journal.commit()
         return pb.Empty()
 
     async def Exec(self, request: pb.ExecReq, context) -> pb.ExecResp:
@@ -202,18 +474,183 @@ class Controller(rpc.ControllerAPIServicer):
         h = self.hosts[vm.host]
         return await h.client.Exec(pb.HostExecReq(vm_id=vm.id, argv=request.argv, timeout_sec=request.timeout_sec))
 
+    async def ExecStream(self, request_iterator, context):
+        # straight pass-through to the VM's hostd, a message at a time both ways
+        first = await anext(request_iterator, None)
+        if first is None:
+            return
+        vm = self.vms.get(first.vm_id)
+        if not vm:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        async with aclosing(relay(first, request_iterator, self.hosts[vm.host].client.ExecStream)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    def _descendants(self, root: str) -> List[str]:
+        # children, grandchildren, ... of root, breadth first (one pass over the VMs)
+        children: Dict[str, List[str]] = {}
+        for vm in self.vms.values():
+            if vm.parent:
+                children.setdefault(vm.parent, []).append(vm.id)
+        out, todo = [], deque(children.get(root, ()))
+        while todo:
+            vm_id = todo.popleft()
+            out.append(vm_id)
+            todo.extend(children.get(vm_id, ()))
+        return out
+
+    async def MapExec(self, request: pb.MapExecReq, context):
+        if not request.argv:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "argv required")
+        ids = list(request.vm_ids)
+        if request.pool_id:
+            ids += self._get_pool(request.pool_id, context).guests
+        if request.descendants_of:
+            ids += self._descendants(request.descendants_of)
+        ids = list(dict.fromkeys(ids))
+        width = request.parallel or MAP_PARALLEL
+        per_host: Dict[str, asyncio.Semaphore] = {}
+
+        async def one(index: int, vm_id: str) -> pb.MapExecResult:
+            vm = self.vms.get(vm_id)
+            if not vm:
+                return pb.MapExecResult(vm_id=vm_id, index=index, error="unknown vm")
+            argv = [a.replace("{vm_id}", vm_id).replace("{index}", str(index)) for a in request.argv]
+            async with per_host.setdefault(vm.host, asyncio.Semaphore(width)):
+                try:
+                    r = await self.hosts[vm.host].client.Exec(pb.HostExecReq(vm_id=vm_id, argv=argv, timeout_sec=request.timeout_sec))
+                except Exception as e:
+                    return pb.MapExecResult(vm_id=vm_id, host=vm.host, index=index, error=str(e))
+            return pb.MapExecResult(vm_id=vm_id, host=vm.host, index=index, result=r)
+
+        t0 = time.monotonic()
+        tasks = [asyncio.create_task(one(i, vm_id)) for i, vm_id in enumerate(ids)]
+        done = 0
+        try:
+            for fut in asyncio.as_completed(tasks):
+                res = await fut
+                done += 1
+                yield res
+                ok = not res.error and res.result.exit_code == 0
+                if (ok and request.stop_on_success) or (not ok and request.stop_on_failure):
+                    log.info(f"MapExec -- stopping at {res.vm_id} ({'success' if ok else 'failure'})")
+                    break
+        finally:
+            for t in tasks:
+                t.cancel() # the rest are killed in their guests
+            log.info(f"MapExec -- {done}/{len(ids)} VMs in {time.monotonic() - t0:.2f}s")
+
+    def _bulk_targets(self, request: pb.VMIdList, context, pausing: bool = False):
+        # pausing: hot-fork templates are refused (see _offer_warm)
+        ids = list(request.vm_ids)
+        if request.pool_id:
+            ids += self._get_pool(request.pool_id, context).guests
+        vms, missing = [], []
+        for vm_id in dict.fromkeys(ids): # dedup, keep order
+            vm = self.vms.get(vm_id)
+            if not vm:
+                missing.append(pb.VMResult(vm_id=vm_id, error="unknown vm"))
+            elif pausing and vm.state == "TEMPLATE":
+                missing.append(pb.VMResult(vm_id=vm_id, host=vm.host, error="vm is a hot-fork template"))
+            else:
+                vms.append(vm)
+        return vms, missing
+
+    async def _bulk(self, vms: List[VM], method: str, parallel: int = 0) -> List[pb.VMResult]:
+        """Run hostd's `method` (PauseMany/UnpauseMany/DestroyMany) over vms: one RPC per host,
+        all hosts at once. Returns a VMResult per VM."""
+        by_host: Dict[str, List[str]] = {}
+        for vm in vms:
+            by_host.setdefault(vm.host, []).append(vm.id)
+
+        async def one_host(host_name: str, ids: List[str]) -> List[pb.VMResult]:
+            try:
+                call = getattr(self.hosts[host_name].client, method)
+                resp = await call(pb.VMIdList(vm_ids=ids, parallel=parallel))
+                return list(resp.results)
+            except Exception as e:
+                log.error(f"{method} on {host_name} failed: {e}")
+                return [pb.VMResult(vm_id=v, host=host_name, error=str(e)) for v in ids]
+
+        per_host = await asyncio.gather(*(one_host(h, ids) for h, ids in by_host.items()))
+        return [r for results in per_host for r in results]
+
+    # One paused state, PAUSED_WARM, and a VM is on its pool's warm deque exactly when it's in
+    # it: pausing many is recycling them (Release(recycle=True)), unpausing many takes them
+    # out of the pool the way Acquire does.
+    async def PauseMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        vms, results = self._bulk_targets(request, context, pausing=True)
+        results += await self._bulk(vms, "PauseMany", request.parallel)
+        ok = {r.vm_id for r in results if not r.error}
+        for vm in vms:
+            if vm.id in ok and vm.state == "RUNNING":
+                vm.state = "PAUSED_WARM"
+                self._save_vm(vm)
+                pool = self.pools.get(vm.pool)
+                if pool:
+                    async with pool.lock:
+                        self._offer_warm(pool, self.shape_key(vm.shape), vm.id)
+        await self.journal.commit()
+        return pb.BulkResp(results=results)
+
+    async def UnpauseMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        vms, results = self._bulk_targets(request, context, pausing=True)
+        warm = [vm for vm in vms if vm.state == "PAUSED_WARM"]
+        self._unwarm(warm) # before hostd runs them, so no Acquire hands them out meanwhile
+        results += await self._bulk(vms, "UnpauseMany", request.parallel)
+        ok = {r.vm_id for r in results if not r.error}
+        for vm in vms:
+            if vm.id in ok and vm.state == "PAUSED_WARM":
+                vm.state = "RUNNING"
+                self._save_vm(vm)
+        for vm in warm:
+            pool = self.pools.get(vm.pool)
+            if vm.id not in ok and vm.id in self.vms and pool:
+                async with pool.lock:
+                    self._offer_warm(pool, self.shape_key(vm.shape), vm.id) # still paused: back it goes
+        await self.journal.commit()
+        return pb.BulkResp(results=results)
+
+    async def DestroyMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        vms, results = self._bulk_targets(request, context)
+        results += await self._bulk(vms, "DestroyMany", request.parallel)
+        ok = {r.vm_id for r in results if not r.error}
+        self._forget_vms([vm for vm in vms if vm.id in ok])
+        await self.journal.commit()
+        return pb.BulkResp(results=results)
+
+    async def DrainPool(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        if not request.pool_id:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "pool_id required")
+        self._get_pool(request.pool_id, context)
+        stopped = self.autoscaler.disable_pool(request.pool_id) # or it refills what we're tearing down
+        self.journal.delete("autoscale", [f"{pool_id}/{key}" for pool_id, key in stopped])
+        resp = await self.DestroyMany(pb.VMIdList(pool_id=request.pool_id, parallel=request.parallel), context)
+        log.info(f"DrainPool -- {request.pool_id}: {len(resp.results)} VMs, {sum(1 for r in resp.results if r.error)} failed")
+        return resp
+
     async def Health(self, request: pb.Empty, context) -> pb.HealthResp:
         return pb.HealthResp(status="ok")
 
 async def serve():
     server = grpc.aio.server()
     ctrl = Controller()
-
-    # Seed one hostd (localhost:50052) for the scaffold
-    ch = grpc.aio.insecure_channel("127.0.0.1:50052")
-    hostcli = rpc.HostdAPIStub(ch)
-    inv = await hostcli.ReportInventory(pb.Empty())
-    ctrl.hosts[inv.host] = HostInfo(addr="127.0.0.1:50052", inv=inv, client=hostcli)
+    ctrl.restore(ctrl.journal.load()) # whatever we were tracking before a restart
+    ctrl.journal.start()
+    ctrl.watcher = asyncio.create_task(ctrl.watch_hosts())
+    WARM.collect = ctrl.warm_depths
+    await metrics.serve(METRICS_PORT)
+
+    # Seed the hostds; one on localhost:50052 for the scaffold
+    known = {h.addr for h in ctrl.hosts.values()}
+    for addr in os.environ.get("HOSTD_ADDRS", "127.0.0.1:50052").split(","):
+        if addr in known:
+            continue # restored, with what its VMs hold already committed
+        ch = hostd_channel(addr)
+        hostcli = rpc.HostdAPIStub(ch)
+        inv = await hostcli.ReportInventory(pb.Empty())
+        ctrl.add_host(addr, inv, hostcli)
+        log.info(f"hostd {inv.host} at {addr}: cpus={inv.cpus} mem={inv.mem_bytes >> 30}G gpus={list(inv.gpus_bdf)}")
 
     rpc.add_ControllerAPIServicer_to_server(ctrl, server)
     server.add_insecure_port("[::]:50051")
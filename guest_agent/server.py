@@ -2,14 +2,19 @@
 # =====================================================
 # guest_agent/server.py (grpc.aio)
 # =====================================================
-import asyncio, shutil
+import asyncio, os, shutil
+from contextlib import aclosing
 import grpc
 from proto import api_pb2 as pb
 from proto import api_pb2_grpc as rpc
 from common.logs import setup
+from common.streams import exec_stream
+from common.vsock import AGENT_PORT, listen_vsock, splice
 
 log = setup("guest-agent")
 
+AGENT_SOCK = os.environ.get("HC_AGENT_SOCK", "/run/hc-agent.sock") # what vsock connections are spliced to
+
 class Agent(rpc.AgentAPIServicer):
     async def SelfTestGpu(self, request: pb.Empty, context) -> pb.HealthResp:
         if shutil.which("nvidia-smi") is None:
@@ -24,8 +29,16 @@ class Agent(rpc.AgentAPIServicer):
             out, err = await asyncio.wait_for(proc.communicate(), timeout=max(1, request.timeout_sec))
         except asyncio.TimeoutError:
             proc.kill(); return pb.ExecResp(exit_code=124, stdout=b"", stderr=b"timeout")
+        except asyncio.CancelledError:
+            proc.kill(); raise # caller hung up (e.g. MapExec stopped early)
         return pb.ExecResp(exit_code=proc.returncode, stdout=out, stderr=err)
 
+    async def ExecStream(self, request_iterator, context):
+        # output is sent as it's produced, never held whole; hanging up kills the process
+        async with aclosing(exec_stream(request_iterator)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
     async def TeardownCleanup(self, request: pb.Empty, context) -> pb.Empty:
         # TODO: clean /tmp, kill known processes, etc.
         return pb.Empty()
@@ -34,9 +47,36 @@ async def serve():
     server = grpc.aio.server()
     rpc.add_AgentAPIServicer_to_server(Agent(), server)
     server.add_insecure_port("[::]:50053")
+    try:
+        server.add_insecure_port(f"unix:{AGENT_SOCK}")
+        unix = True
+    except RuntimeError as e: # e.g. no /run to write to outside a VM: TCP still works
+        log.error(f"can't listen on {AGENT_SOCK} ({e}), TCP only")
+        unix = False
     log.info("guest-agent listening :50053")
     await server.start()
-    await server.wait_for_termination()
+
+    # hostd reaches us over virtio-vsock (no guest network needed)
+    async def from_host(reader, writer):
+        try:
+            local = await asyncio.open_unix_connection(AGENT_SOCK)
+        except OSError as e:
+            log.error(f"vsock: can't reach {AGENT_SOCK}: {e}")
+            writer.close()
+            return
+        await splice((reader, writer), local)
+    vsock = None
+    if unix: # vsock connections are spliced onto AGENT_SOCK
+        try:
+            vsock = await listen_vsock(AGENT_PORT, from_host)
+            log.info(f"guest-agent listening vsock:{AGENT_PORT}")
+        except OSError as e:
+            log.error(f"no vsock ({e}), TCP only")
+    try:
+        await server.wait_for_termination()
+    finally:
+        if vsock:
+            vsock.close()
 
 if __name__ == "__main__":
     asyncio.run(serve())
\ No newline at end of file
@@ -0,0 +1,136 @@
+# =====================================================
+# hostd/agents.py (vsock CIDs and warm gRPC channels to each VM's guest agent)
+# =====================================================
+import asyncio, itertools, os
+from typing import Dict, List
+
+import grpc
+from proto import api_pb2_grpc as rpc
+
+from common.logs import setup
+from common.metrics import rpc_timers
+from common.vsock import AGENT_PORT, open_vsock, splice
+from qemu import BASE_DIR
+
+log = setup("hostd.agents")
+
+CID_BASE = int(os.environ.get("HC_CID_BASE", "1000")) # guest CIDs are host-wide; stay clear of other vsock users
+CHANNELS_PER_VM = int(os.environ.get("HC_AGENT_CHANNELS", "2"))
+# a guest agent that isn't up yet (booting, just restored) is retried every second, not on
+# gRPC's default backoff that grows to two minutes. Own subchannel pool: otherwise channels to
+# the same target share one connection and the "pool" is a single socket.
+CHANNEL_OPTS = [("grpc.initial_reconnect_backoff_ms", 100), ("grpc.max_reconnect_backoff_ms", 1000),
+                ("grpc.use_local_subchannel_pool", 1)]
+
+class _Agent:
+    def __init__(self, vm_id: str, cid: int):
+        self.vm_id = vm_id
+        self.cid = cid
+        self.sock = BASE_DIR/vm_id/"agent.sock"
+        self.server = None
+        self.channels: List[grpc.aio.Channel] = []
+        self.stubs: List[rpc.AgentAPIStub] = []
+        self.rr = itertools.count()
+
+class Agents:
+    """hostd's way into the guests. Each VM gets a vhost-vsock device with its own CID, and the
+    guest agent serves AgentAPI on vsock port AGENT_PORT: no guest network needed. hostd listens
+    on HC_HOME/<vm>/agent.sock and splices each connection to (cid, AGENT_PORT), and keeps
+    CHANNELS_PER_VM gRPC channels connected through it; calls round-robin over them, so an Exec
+    pays no connection setup. Channels are opened when the VM first runs (a paused guest can't
+    answer a connect) and survive pauses; they reconnect on their own if the guest restarts."""
+    def __init__(self):
+        self.agents: Dict[str, _Agent] = {}
+        self._opening: Dict[str, asyncio.Future] = {} # warm() in progress, per VM
+        self.cids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._next = CID_BASE
+
+    def allocate(self, vm_id: str) -> int:
+        """CID for a VM about to be launched."""
+        if vm_id not in self.cids:
+            if self._free:
+                self.cids[vm_id] = self._free.pop()
+            else:
+                self.cids[vm_id] = self._next
+                self._next += 1
+        return self.cids[vm_id]
+
+    def adopt(self, vm_id: str, cid: int):
+        """VM launched by an earlier hostd: keep its CID (and never hand that one out again)."""
+        if cid is None:
+            return
+        self.cids[vm_id] = cid
+        self._next = max(self._next, cid + 1)
+
+    async def warm(self, vm_id: str) -> _Agent:
+        """The VM's agent, its bridge and channels opened on first use. Concurrent callers share
+        one opening; a VM is only in self.agents once it's fully set up."""
+        a = self.agents.get(vm_id)
+        if a:
+            return a
+        if vm_id not in self.cids:
+            raise LookupError(f"{vm_id} has no vsock CID")
+        opening = self._opening.get(vm_id)
+        if opening is None:
+            opening = self._opening[vm_id] = asyncio.ensure_future(self._open(vm_id, self.cids[vm_id]))
+            def done(f):
+                if self._opening.get(vm_id) is f:
+                    del self._opening[vm_id]
+            opening.add_done_callback(done)
+        return await asyncio.shield(opening) # one caller giving up doesn't undo it for the rest
+
+    async def _open(self, vm_id: str, cid: int) -> _Agent:
+        a = _Agent(vm_id, cid)
+
+        async def bridge(reader, writer):
+            try:
+                guest = await open_vsock(cid, AGENT_PORT)
+            except OSError as e:
+                log.info(f"{vm_id}: guest agent not reachable on vsock {cid}:{AGENT_PORT}: {e}")
+                writer.close()
+                return
+            await splice((reader, writer), guest)
+
+        try:
+            os.unlink(a.sock) # left by an earlier hostd
+        except FileNotFoundError:
+            pass
+        try:
+            a.server = await asyncio.start_unix_server(bridge, path=str(a.sock))
+            target = f"unix:{a.sock.resolve()}"
+            for _ in range(CHANNELS_PER_VM):
+                ch = grpc.aio.insecure_channel(target, options=CHANNEL_OPTS, interceptors=rpc_timers())
+                a.channels.append(ch)
+                ch.get_state(try_to_connect=True) # connect now, not on the first call
+                a.stubs.append(rpc.AgentAPIStub(ch))
+        except BaseException:
+            await self._shut(a)
+            raise
+        self.agents[vm_id] = a
+        log.info(f"{vm_id}: {CHANNELS_PER_VM} agent channels via vsock cid {cid}")
+        return a
+
+    async def stub(self, vm_id: str) -> rpc.AgentAPIStub:
+        a = await self.warm(vm_id)
+        return a.stubs[next(a.rr) % len(a.stubs)]
+
+    async def close(self, vm_id: str):
+        """VM is gone: drop its channels and bridge and give its CID back."""
+        opening = self._opening.pop(vm_id, None)
+        if opening:
+            opening.cancel() # _open cleans up after itself
+            await asyncio.gather(opening, return_exceptions=True)
+        a = self.agents.pop(vm_id, None)
+        if a:
+            await self._shut(a)
+        cid = self.cids.pop(vm_id, None)
+        if cid is not None:
+            self._free.append(cid)
+
+    @staticmethod
+    async def _shut(a: _Agent):
+        for ch in a.channels:
+            await ch.close()
+        if a.server:
+            a.server.close()
@@ -0,0 +1,91 @@
+# =====================================================
+# hostd/forkpoints.py (frozen disk layers + who depends on them)
+# =====================================================
+from typing import Dict, List, Set
+
+from common.logs import setup
+from stash import vm_stash
+
+log = setup("hostd.forkpoints")
+
+class ForkPoint:
+    """A frozen layer of one VM's disk. `writes` is the VM's disk write counter when the layer
+    was frozen: while it hasn't moved, the live top is still empty and this layer *is* the
+    VM's current disk, so a new fork can reuse it instead of freezing another one."""
+    def __init__(self, vm_id: str, gen: int, overlay: str, writes: int):
+        self.vm_id = vm_id
+        self.gen = gen
+        self.overlay = overlay
+        self.writes = writes
+        self.children: Set[str] = set() # VMs (or saved images) backed by this layer
+
+class ForkPoints:
+    def __init__(self):
+        self._by_vm: Dict[str, List[ForkPoint]] = {} # vm_id -> its fork points, oldest first
+        self._by_overlay: Dict[str, ForkPoint] = {}
+        self._holds: Dict[str, ForkPoint] = {} # child -> the fork point it's backed by
+        self._orphans: Set[str] = set() # destroyed VMs whose layers are still backing someone
+
+    def latest(self, vm_id: str) -> ForkPoint:
+        fps = self._by_vm.get(vm_id)
+        return fps[-1] if fps else None
+
+    def of(self, vm_id: str) -> List[ForkPoint]:
+        return list(self._by_vm.get(vm_id, ()))
+
+    def reusable(self, vm_id: str, writes: int) -> ForkPoint:
+        """The latest fork point of vm_id if the guest hasn't written since it was frozen."""
+        fp = self.latest(vm_id)
+        if fp and fp.writes == writes:
+            return fp
+        return None
+
+    def add(self, vm_id: str, gen: int, overlay: str, writes: int) -> ForkPoint:
+        fp = ForkPoint(vm_id, gen, overlay, writes)
+        self._by_vm.setdefault(vm_id, []).append(fp)
+        self._by_overlay[overlay] = fp
+        return fp
+
+    def ref(self, overlay: str, child: str) -> bool:
+        """Record that `child` is backed by `overlay`; False if it isn't one of our layers."""
+        fp = self._by_overlay.get(overlay)
+        if not fp:
+            return False
+        fp.children.add(child)
+        self._holds[child] = fp
+        log.info(f"fork point {fp.vm_id}@{fp.gen}: +{child} ({len(fp.children)} children)")
+        return True
+
+    def unref(self, child: str) -> List[str]:
+        """Drop child's hold. Returns the destroyed parents that nothing depends on any more
+        (their directories can go now)."""
+        fp = self._holds.pop(child, None)
+        if not fp:
+            return []
+        fp.children.discard(child)
+        log.info(f"fork point {fp.vm_id}@{fp.gen}: -{child} ({len(fp.children)} children)")
+        if fp.vm_id in self._orphans and not self.pinned(fp.vm_id):
+            self._orphans.discard(fp.vm_id)
+            self._forget(fp.vm_id)
+            return [fp.vm_id]
+        return []
+
+    def pinned(self, vm_id: str) -> bool:
+        return any(fp.children for fp in self._by_vm.get(vm_id, ()))
+
+    def retire(self, vm_id: str) -> bool:
+        """vm_id is being destroyed. True if its files can go now; False if some child still
+        reads its layers, in which case unref() hands it back once the last one is gone."""
+        if self.pinned(vm_id):
+            self._orphans.add(vm_id)
+            return False
+        self._forget(vm_id)
+        return True
+
+    def _forget(self, vm_id: str):
+        for fp in self._by_vm.pop(vm_id, ()):
+            self._by_overlay.pop(fp.overlay, None)
+            vm_stash.retire(fp.overlay) # no more spawns from it: drop its stash and spawn count
+
+    def children(self, vm_id: str) -> int:
+        return sum(len(fp.children) for fp in self._by_vm.get(vm_id, ()))
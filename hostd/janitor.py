@@ -0,0 +1,99 @@
+# =====================================================
+# hostd/janitor.py (batched, rate-limited VM dir garbage collection)
+# =====================================================
+import asyncio, os, shutil
+from collections import deque
+from typing import Deque, List
+
+from common.logs import setup
+from qemu import BASE_DIR, ram_path
+from stash import vm_stash
+
+log = setup("hostd.janitor")
+
+GC_BATCH = 32 # VM dirs removed per pass (one executor job)
+GC_BYTES_PER_SEC = int(os.environ.get("HC_GC_BPS", str(512 << 20))) # deletion rate cap, so teardown doesn't starve guests' I/O
+
+def _du(path) -> int:
+    """Bytes actually allocated under path (sparse overlays count what they use, not their size)."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return 0
+    if not os.path.isdir(path) or os.path.islink(path):
+        return st.st_blocks * 512
+    total = st.st_blocks * 512
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+def _remove(vm_ids: List[str]) -> int:
+    freed = 0
+    for vm_id in vm_ids:
+        vdir, ram = BASE_DIR / vm_id, ram_path(vm_id)
+        freed += _du(vdir) + _du(ram)
+        shutil.rmtree(vdir, ignore_errors=True)
+        try:
+            os.unlink(ram)
+        except FileNotFoundError:
+            pass
+    return freed
+
+class Janitor:
+    """Deletes destroyed VMs' files off the Destroy path. Destroy fences the VM (its QEMU is
+    gone) and hands the dir over; the janitor removes dirs in batches on a worker thread, no
+    shell per VM, capped at GC_BYTES_PER_SEC. A VM whose frozen layers still back a live child
+    (or a saved image) isn't touched: forkpoints holds it until the last dependant goes, and
+    release() then queues it."""
+    def __init__(self, forkpoints):
+        self.forkpoints = forkpoints
+        self.queue: Deque[str] = deque()
+        self.wake = asyncio.Event()
+        self.reclaimed_bytes = 0
+        self.reclaimed_dirs = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def collect(self, vm_id: str) -> bool:
+        """vm_id is fenced. Queue its files, unless something is still backed by them (then
+        False: they're queued when that something is released)."""
+        if not self.forkpoints.retire(vm_id):
+            log.info(f"keeping {vm_id} files for {self.forkpoints.children(vm_id)} children")
+            return False
+        self._enqueue(vm_id)
+        return True
+
+    def release(self, vm_id: str):
+        """vm_id no longer needs the fork point it was created from; queue parents that were
+        only waiting on it."""
+        for parent in self.forkpoints.unref(vm_id):
+            self._enqueue(parent)
+
+    def _enqueue(self, vm_id: str):
+        vm_stash.retire_under(BASE_DIR/vm_id) # its fork points can't back new VMs any more
+        self.queue.append(vm_id)
+        self.wake.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            while self.queue:
+                batch = [self.queue.popleft() for _ in range(min(GC_BATCH, len(self.queue)))]
+                try:
+                    freed = await loop.run_in_executor(None, _remove, batch)
+                except Exception as e:
+                    log.error(f"gc of {batch} failed: {e}")
+                    continue
+                self.reclaimed_bytes += freed
+                self.reclaimed_dirs += len(batch)
+                log.info(f"gc: removed {len(batch)} VM dirs, {freed >> 20} MiB "
+                         f"(total {self.reclaimed_dirs} dirs, {self.reclaimed_bytes >> 20} MiB, {len(self.queue)} queued)")
+                await asyncio.sleep(freed / GC_BYTES_PER_SEC)
@@ -0,0 +1,114 @@
+# =====================================================
+# hostd/maintenance.py (background backing-chain flattening)
+# =====================================================
+import asyncio, os
+from typing import Dict, Tuple
+
+from common.logs import setup
+from qmp import QMPError
+
+log = setup("hostd.maintenance")
+
+MAX_CHAIN_DEPTH = int(os.environ.get("HC_MAX_CHAIN_DEPTH", "4")) # qcow2 layers allowed above the base image
+STREAM_SPEED = int(os.environ.get("HC_STREAM_BPS", str(32 << 20))) # bytes/sec per flatten job
+IDLE_LOAD = 0.5   # 1-min load average per cpu under which the host counts as idle
+SCAN_SECS = 30.0  # how often chains are measured
+CHECK_SECS = 1.0  # how often a running job re-checks the host load
+PREEMPT_SECS = 5.0 # how long a freeze waits for a cancelled job to get out of the way
+
+def host_idle() -> bool:
+    return os.getloadavg()[0] / (os.cpu_count() or 1) < IDLE_LOAD
+
+class Flattener:
+    """Keeps fork lineages' disk chains short. Every fork freezes a layer under the parent, so
+    long-lived VMs (and forks of forks) end up reading through ever deeper qcow2 chains. When
+    the host is idle, a VM deeper than MAX_CHAIN_DEPTH gets a throttled block-stream that
+    pulls the intermediate layers up into its live top, leaving it directly on the base image.
+    Streaming only writes the VM's own top, so frozen layers other VMs are backed by are
+    never touched (block-commit would rewrite them). The job is paused while the host is
+    busy, one VM is flattened at a time, and a fork of that VM cancels it (see preempt)."""
+    def __init__(self, hostd):
+        self.hostd = hostd
+        self.jobs: Dict[str, Tuple[str, asyncio.Event]] = {} # vm_id -> (job id, set when it's over)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(SCAN_SECS)
+            try:
+                await self.scan()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"flatten scan failed: {e}")
+
+    async def scan(self):
+        for rec in list(self.hostd.vms.values()):
+            if not host_idle():
+                return
+            if rec.state == "TEMPLATE" or rec.id in self.jobs:
+                continue # a template's live top is never read by anyone
+            try:
+                chain = await rec.qmp.backing_chain(rec.top_node)
+            except (QMPError, ConnectionError, OSError) as e:
+                log.error(f"flatten {rec.id}: can't read chain: {e}")
+                continue
+            if len(chain) - 1 > MAX_CHAIN_DEPTH:
+                await self.flatten(rec, chain)
+
+    async def flatten(self, rec, chain):
+        job = f"flatten-{rec.id}-{rec.disk_gen}"
+        done = asyncio.Event()
+        q = rec.qmp.subscribe()
+        try:
+            async with rec.lock: # a freeze can't move the top while we start
+                if rec.id not in self.hostd.vms or rec.top_node != chain[0][0]:
+                    return
+                log.info(f"flatten {rec.id}: depth {len(chain) - 1} -> 1 onto {chain[-1][1]} at {STREAM_SPEED >> 20} MiB/s")
+                await rec.qmp.block_stream(job, rec.top_node, chain[-1][0], STREAM_SPEED)
+                self.jobs[rec.id] = (job, done)
+            paused = False
+            while True:
+                try:
+                    ev = await asyncio.wait_for(q.get(), CHECK_SECS)
+                except asyncio.TimeoutError:
+                    if rec.id not in self.hostd.vms:
+                        return
+                    idle = host_idle()
+                    if paused == idle:
+                        # busy host: stop competing with guests for I/O until it quiets down
+                        await rec.qmp.execute("block-job-resume" if paused else "block-job-pause", {"device": job})
+                        paused = not paused
+                    continue
+                if ev.get("event") not in ("BLOCK_JOB_COMPLETED", "BLOCK_JOB_CANCELLED") or ev["data"].get("device") != job:
+                    continue
+                if ev["data"].get("error"):
+                    log.error(f"flatten {rec.id}: {ev['data']['error']}")
+                else:
+                    log.info(f"flatten {rec.id}: {ev['event'].lower()}")
+                return
+        except (QMPError, ConnectionError) as e:
+            log.error(f"flatten {rec.id}: {e}")
+        finally:
+            rec.qmp.unsubscribe(q)
+            self.jobs.pop(rec.id, None)
+            done.set()
+
+    async def preempt(self, rec):
+        """Caller holds rec.lock and is about to freeze the disk: forks win, so a flatten running
+        on this VM is cancelled (it'll be picked up again by a later scan)."""
+        job, done = self.jobs.get(rec.id, (None, None))
+        if not job:
+            return
+        log.info(f"flatten {rec.id}: cancelled for a fork")
+        try:
+            await rec.qmp.execute("block-job-cancel", {"device": job, "force": True})
+        except QMPError:
+            pass # it finished on its own in the meantime
+        try:
+            await asyncio.wait_for(done.wait(), PREEMPT_SECS)
+        except asyncio.TimeoutError:
+            log.error(f"flatten {rec.id}: {job} still running after cancel")
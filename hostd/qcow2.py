@@ -0,0 +1,90 @@
+# =====================================================
+# hostd/qcow2.py (in-process qcow2 overlay writer)
+# =====================================================
+import os, struct
+
+QCOW_MAGIC = 0x514649fb # "QFI\xfb"
+CLUSTER_BITS = 16       # 64 KiB clusters, same as qemu-img's default
+CLUSTER = 1 << CLUSTER_BITS
+REFCOUNT_ORDER = 4      # 16-bit refcounts
+MAX_BACKING_NAME = 1023 # QEMU refuses longer backing file names
+
+EXT_END = 0x00000000
+EXT_BACKING_FORMAT = 0xe2792aca
+
+# version 3 header; everything big-endian
+HEADER = struct.Struct(">IIQIIQIIQQIIQQQQII")
+
+def virtual_size(path) -> int:
+    """Guest-visible size of a disk image: the size field of a qcow2 header, else the file size (raw)."""
+    with open(path, "rb") as f:
+        head = f.read(32)
+    if len(head) == 32 and struct.unpack_from(">I", head)[0] == QCOW_MAGIC:
+        return struct.unpack_from(">Q", head, 24)[0]
+    return os.path.getsize(path)
+
+def backing_file(path) -> str:
+    """Backing file name stored in a qcow2 header, resolved the way QEMU resolves it (a
+    relative name is relative to the image's own directory); None for raw or unbacked images."""
+    with open(path, "rb") as f:
+        head = f.read(20)
+        if len(head) < 20 or struct.unpack_from(">I", head)[0] != QCOW_MAGIC:
+            return None
+        offset, size = struct.unpack_from(">QI", head, 8)
+        if not offset:
+            return None
+        name = os.fsdecode(os.pread(f.fileno(), size, offset))
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name)
+
+def check_chain(path) -> int:
+    """Follow path's backing chain down to its base, as QEMU will when it opens it; the
+    chain's depth. Raises FileNotFoundError naming the first layer whose backing is missing."""
+    depth = 0
+    while (backing := backing_file(path)) is not None:
+        if not os.path.exists(backing):
+            raise FileNotFoundError(f"{path}: backing file {backing} not found")
+        path, depth = backing, depth + 1
+    return depth
+
+def _pad8(b: bytes) -> bytes:
+    return b + b"\0" * (-len(b) % 8)
+
+def create_overlay(path, backing: str, backing_fmt: str = "qcow2", size: int = None) -> None:
+    """Write an empty qcow2 v3 image at `path` backed by `backing`; the same file
+    `qemu-img create -f qcow2 -F <backing_fmt> -b <backing> <path>` produces, minus the fork+exec.
+    A relative backing name is relative to the overlay's directory (as QEMU reads it)."""
+    backing_name = os.fsencode(backing)
+    if len(backing_name) > MAX_BACKING_NAME:
+        raise ValueError(f"backing file name too long: {backing}")
+    if size is None:
+        size = virtual_size(os.path.join(os.path.dirname(os.fspath(path)), backing))
+
+    # cluster 0 header, 1 refcount table, 2 refcount block, 3.. L1 table (all zero: nothing allocated)
+    l2_entries = CLUSTER // 8
+    l1_size = -(-size // (CLUSTER * l2_entries))
+    l1_clusters = max(1, -(-l1_size * 8 // CLUSTER))
+    reftable, refblock, l1 = CLUSTER, 2 * CLUSTER, 3 * CLUSTER
+    n_clusters = 3 + l1_clusters
+
+    exts = struct.pack(">II", EXT_BACKING_FORMAT, len(backing_fmt)) + _pad8(backing_fmt.encode())
+    exts += struct.pack(">II", EXT_END, 0)
+    header = HEADER.pack(
+        QCOW_MAGIC, 3,
+        HEADER.size + len(exts), len(backing_name), # backing file name sits right after the extensions
+        CLUSTER_BITS, size,
+        0,                     # no encryption
+        l1_size, l1,
+        reftable, 1,           # refcount table: one cluster
+        0, 0,                  # no internal snapshots
+        0, 0, 0,               # incompatible / compatible / autoclear feature bits
+        REFCOUNT_ORDER, HEADER.size,
+    )
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.pwrite(fd, header + exts + backing_name, 0)
+        os.pwrite(fd, struct.pack(">Q", refblock), reftable)
+        os.pwrite(fd, struct.pack(f">{n_clusters}H", *([1] * n_clusters)), refblock)
+        os.ftruncate(fd, n_clusters * CLUSTER) # the L1 table is the zero tail of the file
+    finally:
+        os.close(fd)
@@ -1,85 +1,118 @@
 # =====================================================
 # hostd/qemu.py (spawn/pause/unpause stubs)
 # =====================================================
-import asyncio, os, pathlib, shlex, time
-from subprocess import CalledProcessError
+import os, pathlib, shlex
+from typing import List, Tuple
 
 from common.logs import setup
-from common.symbols import HC_HOME
+from common.symbols import HC_HOME, HC_SHM
+from common.metrics import PHASE
+import storage
+from stash import vm_stash
+from supervisor import supervisor
 
 log = setup("hostd.qemu")
 
-BASE_DIR = pathlib.Path(HC_HOME)
+# absolute: QEMU records disk paths as it was given them (a frozen layer's backing name is its
+# parent's filename) and resolves relative ones against the image's directory, not our cwd
+BASE_DIR = pathlib.Path(HC_HOME).resolve()
 BASE_DIR.mkdir(parents=True, exist_ok=True)
+SNAP_DIR = BASE_DIR / "snapshots" # saved VM images (SaveVM), one dir per snapshot id
+SHM_DIR = pathlib.Path(HC_SHM)
+SHM_DIR.mkdir(parents=True, exist_ok=True)
 
-async def start_qemu(vmid: str, gpu_bdf: str, overlays: dict = {}, from_fork: bool = False) -> None:
-    """Start QEMU with a VFIO GPU? someday attached. Minimal flags for MVP scaffold."""
+GUEST_RAM_MB = 1048 # TODO: make this configurable
+
+def ram_path(vmid: str) -> pathlib.Path:
+    """tmpfs file backing the VM's RAM"""
+    return SHM_DIR / f"{vmid}.ram"
+
+def guest_ram(vmid: str, overlays: dict = {}) -> Tuple[str, bool]:
+    """(file the VM's RAM is mapped from, shared?): its own file, mapped shared, or for a
+    hot-fork child / lazy restore the template's or snapshot's file, mapped private."""
+    memory = overlays.get('memory', None)
+    return (memory, False) if memory else (str(ram_path(vmid)), True)
+
+# absolute, so a VM dir (or a stashed one, see stash.py) stays valid wherever it's moved
+BASE_IMAGE = os.path.abspath(os.path.join(BASE_DIR, "..", "linux", "root.qcow2"))
+
+def overlay_backing(parent_overlay: str = None) -> str:
+    """Backing file for a new VM's writable overlay: a forked parent's frozen layer, or the base image."""
+    return parent_overlay or BASE_IMAGE
+
+def create_overlay(vdir: pathlib.Path, parent_overlay: str = None) -> None:
+    """Write the VM's writable disk in vdir: an empty qcow2 overlay (a few KB of header, no
+    qemu-img), or a reflink clone of the parent's image on reflink hosts (see storage.py)."""
+    storage.backend.make_disk(vdir / "vm-001.overlay.qcow2", overlay_backing(parent_overlay))
+
+def prepare_vm_dir(vmid: str, parent_overlay: str = None) -> pathlib.Path:
+    """HC_HOME/<vmid> with its overlay in place: a stashed one renamed in if there is one ready."""
     vdir = BASE_DIR / vmid
-    vdir.mkdir(parents=True, exist_ok=True)
+    backing = overlay_backing(parent_overlay)
+    with PHASE.labels("overlay_create").time():
+        vm_stash.note(backing)
+        if vm_stash.claim(backing, vdir):
+            return vdir
+        vdir.mkdir(parents=True, exist_ok=True)
+        create_overlay(vdir, parent_overlay)
+    return vdir
+
+def qemu_argv(vdir: pathlib.Path, gpu_bdf: str, overlays: dict = {}, cid: int = None) -> List[str]:
+    """qemu-system-x86_64 argv for the VM living in vdir (run directly, no shell). cid: the
+    guest's vsock address, for hostd to reach its agent (agents.py)."""
     qmp_sock = vdir / "qmp.sock"
 
-    parent_overlay = overlays.get('overlay', None)
-    vmstate_overlay = overlays.get('vmstate', None)
-
-    if parent_overlay:
-        # overlay_cmd = (
-        #     "cp " 
-        #     # "--reflink=always " # this is supported for btrfs -- instant copy; ext4 copies everything (and errors)
-                                    # the original file DOESN"T get over written in btrfs, it gets a new inode to replace it
-                                    # i.e., btrfs, zfs, etc are copy-on write, too!
-        #     "{parent_overlay} " 
-        #     "{vdir}/vm-001.overlay.qcow2 "
-        # ).format(vdir=str(vdir), parent_overlay=parent_overlay)
-        overlay_cmd = (
-            "qemu-img create -f qcow2 -F qcow2 "
-            "-b {parent_overlay} "
-            "{vdir}/vm-001.overlay.qcow2 "
-        ).format(vdir=str(vdir), parent_overlay=parent_overlay)
-    else:
-        overlay_cmd = (
-            "qemu-img create -f qcow2 -F qcow2 "
-            "-b ../../linux/root.qcow2 "
-            "{vdir}/vm-001.overlay.qcow2 "
-        ).format(vdir=str(vdir))
-
-    log.info(f'qemu overlay creation: overlay_cmd={overlay_cmd} parent_overlay={parent_overlay} overlays={overlays}')
+    # Guest RAM is a file on tmpfs. A normal VM maps its own file shared, so the file *is* its
+    # memory and a paused VM can serve as a hot-fork template as-is. A hot-fork child maps the
+    # template's file private (copy-on-write: clean pages stay shared with the parent) and
+    # waits with -incoming for the template's device state.
+    # No mem-lock for the private mapping: mlockall(MCL_FUTURE) populates a private writable
+    # mapping with write faults, i.e. copies every page of the template's RAM at startup, and
+    # nothing stays shared. Unlocked, pages fault in (read: shared, write: copied) as touched.
+    ram, shared = guest_ram(vdir.name, overlays)
+    memory_backend = ["-object", f"memory-backend-file,id=ram0,size={GUEST_RAM_MB}M,mem-path={ram},share={'on' if shared else 'off'}"]
+    mem_lock = "on" if shared else "off"
+    incoming = ["-incoming", "defer"] if overlays.get('vmstate', None) else []
+    # hot-fork children and restores get their own CID too: it's a device property, not
+    # migrated state, and the guest is told to re-read it after the incoming migration
+    vsock = ["-device", f"vhost-vsock-pci,id=vsock0,guest-cid={cid}"] if cid is not None else []
 
     wait_flag = 'on'
     # this causes the qemu process to wait before the sock is ready
 
 
-    base_image_chain = (
-        # overlay (writable)            
-        "-blockdev driver=file,filename={vdir}/vm-001.overlay.qcow2,locking=on,node-name=ovlfile "
-        "-blockdev driver=qcow2,file=ovlfile,node-name=overlay "
-    ).format(vdir=vdir)
+    base_image_chain = [
+        # overlay (writable)
+        "-blockdev", f"driver=file,filename={vdir}/vm-001.overlay.qcow2,locking=on,node-name=ovlfile",
+        "-blockdev", "driver=qcow2,file=ovlfile,node-name=overlay",
+    ]
 
-    cmd = (
-        # create overlay for this particular VM
-        "{overlay_cmd} "
-        
-        " ; " # this allows to run 2 cmds concurrently
-        
-        "qemu-system-x86_64 "
-        # prevent the qemu process from grabbing the server's TTY 
-        "-display none -serial none -monitor none -parallel none -daemonize "
+    return [
+        "qemu-system-x86_64",
+        # prevent the qemu process from grabbing the server's TTY; no -daemonize, the
+        # supervisor is its parent and watches it
+        "-display", "none", "-serial", "none", "-monitor", "none", "-parallel", "none",
+        # start paused, and stay paused after an incoming migration (no autostart): hostd
+        # records and pools new VMs as PAUSED_WARM, and only a cont (Unpause, FastRestore) runs them
+        "-S",
 
         # keep track of logs, pid files
-        "-pidfile {vdir}/qemu.pid "
-        "-D {vdir}/qemu.log -msg timestamp=on "
+        "-pidfile", f"{vdir}/qemu.pid",
+        "-D", f"{vdir}/qemu.log", "-msg", "timestamp=on",
 
         # use lean q35 pcie for VFIO, turn off unused systems
-        "-machine q35,accel=kvm,kernel-irqchip=on,usb=off,vmport=off,smm=off,mem-merge=on "
-        "-cpu host,+invtsc,-hypervisor "
-        "-smp 2 -m 1048 " # TODO: make this configurable
-        
+        "-machine", "q35,accel=kvm,kernel-irqchip=on,usb=off,vmport=off,smm=off,mem-merge=on,memory-backend=ram0",
+        "-cpu", "host,+invtsc,-hypervisor",
+        "-smp", "2", "-m", str(GUEST_RAM_MB),
+        *memory_backend,
+
         # turn this on when we can run as root
         #"-mem-path /dev/hugepages -mem-prealloc "
-        "-nodefaults -no-user-config "
-        "-rtc base=utc,clock=host "
-        "-overcommit mem-lock=on "
-        "-object iothread,id=ioth0 "
-        
+        "-nodefaults", "-no-user-config",
+        "-rtc", "base=utc,clock=host",
+        "-overcommit", f"mem-lock={mem_lock}",
+        "-object", "iothread,id=ioth0",
+
         # uhh....network forthcoming
         #"-netdev tap,id=net0,script=/etc/qemu-ifup,downscript=/etc/qemu-ifdown,vhost=on,queues=4 "
         #"-device virtio-net-pci,netdev=net0,mq=on,vectors=10 "
@@ -95,40 +128,43 @@ async def start_qemu(vmid: str, gpu_bdf: str, overlays: dict = {}, from_fork: bo
         # "-blockdev driver=file,filename={vdir}/vm-001.overlay.qcow2,locking=on,node-name=ovlfile "
         # "-blockdev driver=qcow2,file=ovlfile,backing=basenode,node-name=overlay "
         # #"-blockdev driver=raw,node-name=vmroot,file.driver=file,file.filename=./linux/root.qcow2,cache.direct=on,cache.no-flush=on "
-        "{base_image_chain} "
+        *base_image_chain,
 
         # attach the device
-        "-device virtio-blk-pci,drive=overlay,iothread=ioth0,bootindex=1 "
+        "-device", "virtio-blk-pci,drive=overlay,iothread=ioth0,bootindex=1",
 
-        "-kernel ./linux/vmlinuz "
-        "-append \"root=/dev/vda rw console=ttyS0 tsc=reliable mitigations=off\" "
-        "-device pcie-root-port,id=rp0,chassis=1,slot=1 "
-        "-device pcie-root-port,id=rp1,chassis=2,slot=2 "
+        "-kernel", "./linux/vmlinuz",
+        "-append", "root=/dev/vda rw console=ttyS0 tsc=reliable mitigations=off",
+        "-device", "pcie-root-port,id=rp0,chassis=1,slot=1",
+        "-device", "pcie-root-port,id=rp1,chassis=2,slot=2",
+        *vsock,
 
         # forthcoming GPU suppport
         #"-device vfio-pci,host=0000:41:00.0,bus=rp0 "
         #"-device vfio-pci,host=0000:41:00.1,bus=rp1 "
 
-        "-qmp unix:{qmp},server=on,wait={wait_flag} "
-    ).format(
-        qmp=str(qmp_sock), bdf=gpu_bdf, vdir=vdir, 
-        base_dir=BASE_DIR, wait_flag=wait_flag, 
-        overlay_cmd=overlay_cmd, base_image_chain=base_image_chain
-    )
-
-    log.info("QEMU start: %s", cmd)
-    proc = await asyncio.create_subprocess_shell(cmd)
-    #rc = await proc.wait()
-    #if rc != 0:
-    #    raise CalledProcessError(rc, cmd)
-
-async def destroy_qemu(vmid: str) -> None:
-    # Scaffold: a real impl would track pids; here we rely on teardown elsewhere
+        "-qmp", f"unix:{qmp_sock},server=on,wait={wait_flag}",
+        *incoming,
+    ]
+
+def launch_qemu(vmid: str, gpu_bdf: str, overlays: dict = {}, cid: int = None) -> None:
+    """Start the QEMU for a VM whose dir is ready, under the supervisor (no shell)."""
     vdir = BASE_DIR / vmid
-    cmd = (
-        #"kill -9 `cat {vdir}/qemu.pid` "
-        #" ; "
-        "rm -rf {vdir}"
-    ).format(vdir=vdir)
-    log.info(f"QEMU KILL: {cmd}")
-    proc = await asyncio.create_subprocess_shell(cmd)
+    argv = qemu_argv(vdir, gpu_bdf, overlays, cid)
+    log.info("QEMU start: %s", shlex.join(argv))
+    with PHASE.labels("qemu_exec").time():
+        supervisor.launch(vmid, argv, stderr_path=vdir / "qemu.stderr")
+
+def start_qemu(vmid: str, gpu_bdf: str, overlays: dict = {}, cid: int = None) -> None:
+    """Start QEMU with a VFIO GPU? someday attached. Minimal flags for MVP scaffold."""
+    parent_overlay = overlays.get('overlay', None)
+    prepare_vm_dir(vmid, parent_overlay)
+    log.info(f'qemu overlay creation: parent_overlay={parent_overlay} overlays={overlays}')
+    launch_qemu(vmid, gpu_bdf, overlays, cid)
+
+def create_overlays(vmids: list, overlays: dict = {}) -> None:
+    """Create the writable overlay for every VM in vmids (all on the same backing file)."""
+    parent_overlay = overlays.get('overlay', None)
+    log.info(f'qemu batch overlay creation: count={len(vmids)} parent_overlay={parent_overlay}')
+    for vmid in vmids:
+        prepare_vm_dir(vmid, parent_overlay)
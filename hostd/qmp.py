@@ -8,81 +8,255 @@ from common.logs import setup
 
 log = setup("qmp.qemu")
 
-import asyncio, os, stat, time
+import asyncio, os
+from typing import Dict, List, Tuple
 
-async def wait_for_qmp(path, timeout=5.0, interval=0.05):
-    deadline = time.time() + timeout
-    last_err = None
-    while time.time() < deadline:
-        try:
-            if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
-                return await asyncio.open_unix_connection(path)
-        except FileNotFoundError as e:
-            last_err = e
-        await asyncio.sleep(interval)
-    raise TimeoutError(f"QMP socket not ready at {path}: {last_err}")
+from readiness import wait_for_path
+
+async def wait_for_qmp(path, timeout=5.0):
+    # woken by inotify on the VM dir; fails fast if the QEMU in qemu.pid dies first
+    pidfile = os.path.join(os.path.dirname(path), "qemu.pid")
+    await wait_for_path(path, sock=True, pidfile=pidfile, timeout=timeout)
+    return await asyncio.open_unix_connection(path)
+
+EVENT_BACKLOG = 256 # per-subscriber queue depth; older events are dropped past this
+MIGRATE_TIMEOUT = 60.0 # seconds to wait for a save/restore migration to finish
+
+class QMPError(Exception):
+    """QEMU answered a command with {"error": ...}"""
+    def __init__(self, command, error):
+        self.command = command
+        self.error = error
+        super().__init__(f"{command}: {error.get('class')}: {error.get('desc')}")
 
 class QMP:
+    """Long-lived QMP session for one VM. hostd keeps one of these per VM; the socket is opened
+    (greeting + qmp_capabilities) once, commands are tagged with an `id` and pipelined, and a
+    reader task resolves each command's future from its reply. Asynchronous events go out to
+    whoever subscribed (see events())."""
     def __init__(self, vm_id):
-        sock = pathlib.Path(HC_HOME)/vm_id/"qmp.sock"
+        sock = pathlib.Path(HC_HOME).resolve()/vm_id/"qmp.sock" # the path qemu_argv gave -qmp
         self.sock = str(sock)
+        self._reader = None
+        self._writer = None
+        self._rx_task = None
+        self._lock = asyncio.Lock() # serializes (re)connects
+        self._seq = 0
+        self._pending: Dict[str, Tuple[str, asyncio.Future]] = {} # id -> (command, future for the reply)
+        self._subs: List[asyncio.Queue] = []
+        self._caps = set() # migration capabilities we've turned on in this QEMU
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
 
     async def _conn(self):
-        log.info(f"QMP - {self.sock}")
-        #reader, writer = await asyncio.open_unix_connection(self.sock)
-        reader, writer = await wait_for_qmp(self.sock)
-        # read greeting
-        await reader.readline()
-        await self.cmd(reader, writer, {"execute": "qmp_capabilities"})
-        return reader, writer
-
-    async def cmd(self, reader, writer, obj):
-        writer.write((json.dumps(obj) + "\n").encode())
-        await writer.drain()
-        # consume one response (ignore content for scaffold)
-        await reader.readline()
+        async with self._lock:
+            if self.connected:
+                return
+            log.info(f"QMP - {self.sock}")
+            #reader, writer = await asyncio.open_unix_connection(self.sock)
+            reader, writer = await wait_for_qmp(self.sock)
+            # read greeting; QEMU sends no events until capabilities are negotiated
+            await reader.readline()
+            writer.write((json.dumps({"execute": "qmp_capabilities"}) + "\n").encode())
+            await writer.drain()
+            resp = json.loads(await reader.readline())
+            if "error" in resp:
+                writer.close()
+                raise QMPError("qmp_capabilities", resp["error"])
+            self._reader, self._writer = reader, writer
+            self._rx_task = asyncio.create_task(self._rx())
+
+    async def _rx(self):
+        # one reader per session: replies resolve futures by id, events fan out to subscribers
+        reader = self._reader
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = json.loads(line)
+                if "event" in msg:
+                    self._publish(msg)
+                    continue
+                command, fut = self._pending.pop(msg.get("id"), (None, None))
+                if fut is None or fut.done():
+                    continue
+                if "error" in msg:
+                    fut.set_exception(QMPError(command, msg["error"]))
+                else:
+                    fut.set_result(msg.get("return"))
+        except (ConnectionError, ValueError) as e:
+            log.error(f"QMP - {self.sock} reader died: {e}")
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            self._reader = self._writer = None
+            pending, self._pending = self._pending, {}
+            for _, fut in pending.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError(f"QMP session {self.sock} closed"))
+
+    def _publish(self, msg):
+        for q in self._subs:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(msg)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue that receives every event from now on. Subscribe *before* issuing the
+        command whose event you want to see."""
+        q = asyncio.Queue(maxsize=EVENT_BACKLOG)
+        self._subs.append(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        if q in self._subs:
+            self._subs.remove(q)
+
+    async def events(self):
+        """Async iterator over the VM's QMP events ({"event", "data", "timestamp"})."""
+        q = self.subscribe()
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            self.unsubscribe(q)
+
+    async def cmd(self, obj):
+        """Send one command and return its parsed "return" value (raises QMPError)."""
+        await self._conn()
+        self._seq += 1
+        tag = str(self._seq)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[tag] = (obj.get("execute"), fut)
+        self._writer.write((json.dumps({**obj, "id": tag}) + "\n").encode())
+        await self._writer.drain()
+        return await fut
+
+    async def execute(self, command, arguments=None):
+        obj = {"execute": command}
+        if arguments:
+            obj["arguments"] = arguments
+        return await self.cmd(obj)
+
+    async def close(self):
+        if self._rx_task is not None:
+            self._rx_task.cancel()
+            try:
+                await self._rx_task
+            except asyncio.CancelledError:
+                pass
+            self._rx_task = None
+
+    async def ready(self):
+        # the session is up once the handshake is done, so QEMU is answering
+        await self._conn()
 
     async def stop(self):
         # this really means 'pause'
-        r, w = await self._conn()
-        await self.cmd(r, w, {"execute": "stop"}); w.close(); await w.wait_closed()
+        await self.execute("stop")
 
     async def cont(self):
-        r, w = await self._conn()
-        await self.cmd(r, w, {"execute": "cont"}); w.close(); await w.wait_closed()
+        await self.execute("cont")
 
     async def kill(self):
-        # qemu process is killed
-        r, w = await self._conn()
-        await self.cmd(r, w, {"execute": "quit"}); w.close(); await w.wait_closed()
+        # qemu process is killed; it may hang up before the reply makes it back
+        try:
+            await self.execute("quit")
+        except ConnectionError:
+            pass
+        await self.close()
 
     async def powerdown(self):
-        r, w = await self._conn()
-        await self.cmd(r, w, {"execute": "system_powerdown"}); w.close(); await w.wait_closed()
+        await self.execute("system_powerdown")
 
-    async def snapshot_disks(self, pairs):  # [(node_name, snap_path), ...]
-        r,w = await self._conn()
+    async def _migration_done(self, q: asyncio.Queue, timeout: float):
+        async def done():
+            while True:
+                ev = await q.get()
+                if ev.get("event") != "MIGRATION":
+                    continue
+                status = ev["data"]["status"]
+                if status == "completed":
+                    return
+                if status in ("failed", "cancelled"):
+                    info = await self.execute("query-migrate")
+                    raise QMPError("migrate", {"class": "MigrationFailed", "desc": info.get("error-desc", status)})
+        await asyncio.wait_for(done(), timeout)
 
-        resp = await self.cmd(r, w, {"execute":"query-named-block-nodes"})
-        log.info(f'snapshot_disks -- {resp}')
+    async def _set_migrate_caps(self, caps):
+        # "events" so we hear MIGRATION status changes instead of polling query-migrate.
+        # Capabilities stick in QEMU, so whatever an earlier save turned on is turned off again.
+        want = {"events", *caps}
+        states = {c: True for c in want}
+        states.update({c: False for c in self._caps - want})
+        await self.execute("migrate-set-capabilities", {
+            "capabilities": [{"capability": c, "state": v} for c, v in states.items()]})
+        self._caps = want
 
-        # Use a QMP transaction for atomic multi-disk snapshots
+    async def migrate(self, uri, caps=(), timeout=MIGRATE_TIMEOUT):
+        """Migrate (save) the VM to uri; returns once QEMU reports completion."""
+        q = self.subscribe()
+        try:
+            await self._set_migrate_caps(caps)
+            await self.execute("migrate", {"uri": uri})
+            await self._migration_done(q, timeout)
+        finally:
+            self.unsubscribe(q)
+
+    async def migrate_incoming(self, uri, caps=(), timeout=MIGRATE_TIMEOUT):
+        """Load state into a QEMU started with -incoming defer; returns once it's in."""
+        q = self.subscribe()
+        try:
+            await self._set_migrate_caps(caps)
+            await self.execute("migrate-incoming", {"uri": uri})
+            await self._migration_done(q, timeout)
+        finally:
+            self.unsubscribe(q)
+
+    async def disk_writes(self) -> int:
+        """Write + discard requests the guest has issued to its disks so far. Monotonic per
+        device and unaffected by snapshots, so an unchanged value means nothing was written."""
+        stats = await self.execute("query-blockstats")
+        return sum(s["stats"].get("wr_operations", 0) + s["stats"].get("unmap_operations", 0) for s in stats or ())
+
+    async def backing_chain(self, node: str) -> List[Tuple[str, str]]:
+        """[(node_name, filename), ...] for node and everything under it, top first."""
+        nodes = await self.execute("query-named-block-nodes")
+        names = {n["file"]: n["node-name"] for n in nodes if n.get("drv") != "file"}
+        for n in nodes:
+            if n.get("node-name") == node:
+                chain, img = [], n.get("image")
+                while img:
+                    chain.append((names.get(img["filename"], ""), img["filename"]))
+                    img = img.get("backing-image")
+                return chain
+        return []
+
+    async def block_stream(self, job_id: str, node: str, base_node: str, speed: int = 0):
+        """Start copying everything between base_node and node up into node; once done, node
+        sits directly on base_node. Runs as a background job (BLOCK_JOB_COMPLETED at the end)."""
+        args = {"job-id": job_id, "device": node, "base-node": base_node}
+        if speed:
+            args["speed"] = speed
+        await self.execute("block-stream", args)
+
+    async def snapshot_disks(self, snaps):  # [(node_name, snap_path, snap_node_name), ...]
+        """External snapshot of every listed node in one `transaction`: each node becomes the
+        read-only backing of a new qcow2 at snap_path, which takes over as the top of that disk.
+        QEMU drains in-flight I/O for the switch, so the guest keeps running and the old layers
+        are a consistent, frozen point-in-time image."""
         actions = [{
-                    "type":"blockdev-snapshot-sync",
-                    "data":{
-                        "node": node,
-                        "snapshot-file": snap,
-                        "snapshot-node-name": "vm001_overlay_topzz-1",
-                        "format":"qcow2"
-                    }
+                    "type": "blockdev-snapshot-sync",
+                    "data": {
+                        "node-name": node,
+                        "snapshot-file": str(snap),
+                        "snapshot-node-name": snap_node,
+                        "format": "qcow2",
                     }
-                   for node, snap in pairs]
-        # print({"execute":"transaction","arguments":{"actions":actions}})
-        # log.debug({"execute":"transaction","arguments":{"actions":actions}})
-        # r = await self.cmd(r, w, { "execute": "query-block" }); w.close(); await w.wait_closed()
-        # print(json.loads(r))
-
-        resp = await self.cmd(r, w, {"execute":"blockdev-snapshot-sync","arguments": actions[0]['data']}); log.error(f"QMP transaction resp: {resp}");  w.close(); await w.wait_closed()
-        # resp = await self.cmd(r, w, {"execute":"transaction","arguments":{"actions":actions}}); log.info(f"QMP transaction resp: {resp}");  w.close(); await w.wait_closed()
+                   } for node, snap, snap_node in snaps]
+        resp = await self.execute("transaction", {"actions": actions})
+        log.info(f"snapshot_disks -- {snaps}")
         return resp
-
@@ -0,0 +1,167 @@
+# =====================================================
+# hostd/readiness.py (inotify-driven waits on VM dirs)
+# =====================================================
+import asyncio, ctypes, ctypes.util, os, stat, struct, time
+from typing import Dict, List
+
+from common.logs import setup
+
+log = setup("hostd.readiness")
+
+# from <sys/inotify.h>
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_Q_OVERFLOW  = 0x00004000
+IN_NONBLOCK    = 0o0004000
+IN_CLOEXEC     = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_MODIFY | IN_ATTRIB | IN_DELETE
+EVENT_HDR = struct.Struct("iIII") # wd, mask, cookie, len -- then `len` bytes of name
+
+class VMExited(RuntimeError):
+    """QEMU went away while something was waiting on it"""
+
+class _Waiter:
+    __slots__ = ("path", "sock", "pidfile", "fut", "pidfd")
+
+    def __init__(self, path: str, sock: bool, pidfile: str, fut: asyncio.Future):
+        self.path = path
+        self.sock = sock
+        self.pidfile = pidfile
+        self.fut = fut
+        self.pidfd = None
+
+class Readiness:
+    """One inotify fd for all of hostd. Each waiter sits on the watch for its file's directory
+    (HC_HOME/<vm>) and is re-checked only when something in that directory changes. If a
+    pidfile is given, the QEMU it names is tracked with a pidfd, so a VM that dies fails its
+    waiters right away instead of at the timeout. Falls back to polling without inotify."""
+    def __init__(self):
+        self._libc = None
+        self._fd = None # None: not set up yet, -1: inotify unavailable
+        self._wds: Dict[str, int] = {} # dir -> watch descriptor
+        self._waiters: Dict[int, List[_Waiter]] = {} # watch descriptor -> waiters
+
+    def _init(self) -> bool:
+        if self._fd is None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+                if fd < 0:
+                    raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+                asyncio.get_running_loop().add_reader(fd, self._drain)
+                self._libc, self._fd = libc, fd
+            except (OSError, AttributeError) as e:
+                log.error(f"inotify unavailable, falling back to polling: {e}")
+                self._fd = -1
+        return self._fd >= 0
+
+    def _watch(self, d: str) -> int:
+        wd = self._wds.get(d)
+        if wd is None:
+            wd = self._libc.inotify_add_watch(self._fd, d.encode(), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch {d} failed")
+            self._wds[d] = wd
+        return wd
+
+    def _unwatch(self, d: str, wd: int):
+        if self._waiters.get(wd):
+            return
+        self._waiters.pop(wd, None)
+        if self._wds.pop(d, None) is not None:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _drain(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        wds, off = set(), 0
+        while off < len(data):
+            wd, mask, _, n = EVENT_HDR.unpack_from(data, off)
+            off += EVENT_HDR.size + n
+            if mask & IN_Q_OVERFLOW:
+                wds = set(self._waiters) # lost events; re-check everyone
+                break
+            wds.add(wd)
+        for wd in wds:
+            for w in list(self._waiters.get(wd, ())):
+                self._check(w)
+
+    def _check(self, w: _Waiter):
+        if w.fut.done():
+            return
+        try:
+            st = os.stat(w.path)
+            if not w.sock or stat.S_ISSOCK(st.st_mode):
+                w.fut.set_result(None)
+                return
+        except FileNotFoundError:
+            pass
+        if w.pidfile and w.pidfd is None:
+            self._track_pid(w)
+
+    def _track_pid(self, w: _Waiter):
+        try:
+            with open(w.pidfile) as f:
+                pid = int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return # not written yet; we'll hear about it when it is
+        try:
+            w.pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            w.fut.set_exception(VMExited(f"QEMU pid {pid} ({w.pidfile}) is gone"))
+            return
+        asyncio.get_running_loop().add_reader(w.pidfd, self._exited, w, pid)
+
+    def _exited(self, w: _Waiter, pid: int):
+        if not w.fut.done():
+            w.fut.set_exception(VMExited(f"QEMU pid {pid} exited before {w.path} was ready"))
+
+    async def _poll(self, path: str, sock: bool, timeout: float, interval: float = 0.05):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                st = os.stat(path)
+                if not sock or stat.S_ISSOCK(st.st_mode):
+                    return
+            except FileNotFoundError:
+                pass
+            await asyncio.sleep(interval)
+        raise TimeoutError(f"{path} not ready after {timeout}s")
+
+    async def wait_for(self, path: str, sock: bool = False, pidfile: str = None, timeout: float = 5.0):
+        """Return once `path` exists (and is a unix socket, if sock). Raises TimeoutError, or
+        VMExited if the process named in `pidfile` dies first."""
+        if not self._init():
+            return await self._poll(path, sock, timeout)
+        d = os.path.dirname(os.path.abspath(path))
+        try:
+            wd = self._watch(d)
+        except OSError as e:
+            log.error(f"wait_for {path}: {e}; polling instead")
+            return await self._poll(path, sock, timeout)
+
+        w = _Waiter(path, sock, pidfile, asyncio.get_running_loop().create_future())
+        self._waiters.setdefault(wd, []).append(w)
+        try:
+            self._check(w) # anything that happened before the watch went in
+            await asyncio.wait_for(w.fut, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{path} not ready after {timeout}s") from None
+        finally:
+            self._waiters[wd].remove(w)
+            self._unwatch(d, wd)
+            if w.pidfd is not None:
+                asyncio.get_running_loop().remove_reader(w.pidfd)
+                os.close(w.pidfd)
+
+_readiness = Readiness()
+
+async def wait_for_path(path, sock: bool = False, pidfile: str = None, timeout: float = 5.0):
+    await _readiness.wait_for(str(path), sock=sock, pidfile=pidfile and str(pidfile), timeout=timeout)
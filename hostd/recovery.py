@@ -0,0 +1,77 @@
+# =====================================================
+# hostd/recovery.py (what a restarted hostd needs to take its VMs back)
+# =====================================================
+import json, os, pathlib
+from typing import Dict, List, Optional, Tuple
+
+from common.logs import setup
+from common.symbols import HC_HOME
+from qemu import BASE_DIR, SNAP_DIR, SHM_DIR
+from stash import STASH_DIR
+
+log = setup("hostd.recovery")
+
+META = "vm.json"    # per VM dir: what hostd knows about the VM that QEMU can't tell it
+IMAGE = "image.json" # per saved image (SaveVM): the overlays it was saved as
+ADOPT_PARALLEL = 64  # VMs probed (pidfile + QMP) at once on startup
+QMP_TIMEOUT = 5.0    # a QEMU that doesn't answer query-status by then is stopped and collected
+
+NOT_VMS = {SNAP_DIR.name, STASH_DIR.name} # dirs under HC_HOME that aren't VM dirs
+
+def _write_json(path: pathlib.Path, obj: dict):
+    # write-then-rename, so a crash never leaves a half-written file behind
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.rename(tmp, path)
+
+def _read_json(path: pathlib.Path) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_meta(vm_id: str, meta: dict):
+    _write_json(BASE_DIR/vm_id/META, meta)
+
+def write_image(snap_id: str, image: Dict[str, str]):
+    _write_json(SNAP_DIR/snap_id/IMAGE, image)
+
+def qemu_pid(vm_id: str) -> Optional[int]:
+    """pid of the VM's QEMU if it's still running, else None. The pidfile alone isn't
+    proof: the pid may have been reused since, so the process must be the QEMU that was
+    told to write this pidfile."""
+    pidfile = f"{BASE_DIR/vm_id}/qemu.pid" # exactly as qemu_argv passed it to -pidfile
+    relative = f"{HC_HOME}/{vm_id}/qemu.pid" # ... or an older hostd did, before paths were absolute
+    try:
+        with open(pidfile) as f:
+            pid = int(f.read().strip())
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = f.read().split(b"\0")
+    except (OSError, ValueError):
+        return None
+    return pid if pidfile.encode() in argv or relative.encode() in argv else None
+
+def scan() -> List[Tuple[str, dict, Optional[int]]]:
+    """(vm_id, meta, pid or None) for every VM dir under HC_HOME."""
+    found = []
+    with os.scandir(BASE_DIR) as it:
+        for d in it:
+            if d.is_dir(follow_symlinks=False) and d.name not in NOT_VMS:
+                found.append((d.name, _read_json(pathlib.Path(d.path)/META), qemu_pid(d.name)))
+    return found
+
+def saved_images() -> List[Tuple[str, str]]:
+    """(snap_id, overlay) for every saved image: their disk layers must outlive the VMs."""
+    out = []
+    if SNAP_DIR.is_dir():
+        for d in SNAP_DIR.iterdir():
+            overlay = _read_json(d/IMAGE).get('overlay')
+            if overlay:
+                out.append((d.name, overlay))
+    return out
+
+def stray_ram(known: set) -> List[str]:
+    """vm_ids of guest RAM files on tmpfs that belong to no VM dir."""
+    return [p.stem for p in SHM_DIR.glob("*.ram") if p.stem not in known]
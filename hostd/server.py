@@ -2,8 +2,11 @@
 # hostd/server.py (grpc.aio)
 # =====================================================
 import asyncio
+import os
 import pathlib
-from typing import Dict
+import time
+from contextlib import aclosing
+from typing import Dict, Set
 import grpc
 
 from proto import api_pb2 as pb
@@ -11,28 +14,179 @@ from proto import api_pb2_grpc as rpc
 
 from common.logs import setup
 from common.ids import new_id
-from qemu import start_qemu, destroy_qemu
+from common.streams import relay
+from common import metrics
+from common.metrics import PHASE, SPAWN_FAILURES
+from qemu import start_qemu, launch_qemu, create_overlays, guest_ram, BASE_DIR, BASE_IMAGE, SNAP_DIR
 from qmp import QMP
+from forkpoints import ForkPoints
+from maintenance import Flattener
+from stash import vm_stash
+from supervisor import supervisor
+from janitor import Janitor
+from agents import Agents
+import workingset
+import storage
+import recovery
 
 log = setup("hostd")
 
-from common.symbols import HC_HOME
+BULK_PARALLEL = 32 # default max ops at once for PauseMany/UnpauseMany/DestroyMany
+EXEC_GRACE = 10 # seconds on top of an Exec's timeout_sec for reaching the guest agent
+METRICS_PORT = int(os.environ.get("HC_HOSTD_METRICS_PORT", "9152"))
+SHARED_STORAGE = os.environ.get("HC_SHARED_STORAGE", "") == "1" # HC_HOME is mounted at the same path on every host
 
 class VMRec:
-    def __init__(self, vm_id: str, gpu_bdf: str, ip: str = ""):
+    def __init__(self, vm_id: str, gpu_bdf: str, ip: str = "", cid: int = None, overlays: Dict[str, str] = {}):
         self.id = vm_id
         self.gpu_bdf = gpu_bdf
         self.ip = ip
+        self.cid = cid # vsock address of the guest (agents.py)
+        # the file QEMU maps the guest's RAM from. Only a shared mapping of the VM's own file
+        # holds its memory; a private one (hot-fork child, lazy restore) is someone else's file
+        # plus copy-on-write pages that exist only inside QEMU
+        self.ram, self.ram_shared = guest_ram(vm_id, overlays)
         self.state = "PAUSED_WARM"
+        self.qmp = QMP(vm_id) # long-lived session, connected on first use
+        self.lock = asyncio.Lock()
+        self.fork_image: Dict[str, str] = {} # set once the VM is a hot-fork template
+        # top of the VM's disk chain. Each freeze (_freeze_disk) puts a new qcow2 on top and
+        # leaves the old one as a read-only layer forks and saved images can point at
+        self.disk_gen = 0
+        self.top_node = "overlay"
+        self.top_file = BASE_DIR/vm_id/"vm-001.overlay.qcow2"
+        self.exit_status = None # QEMU's exit status once it's gone (supervisor)
+        self.backing = None # fork point (frozen layer) the VM's disk was made on, if any
 
 class Hostd(rpc.HostdAPIServicer):
     def __init__(self, host_name: str = "host-01"):
         self.host = host_name
         self.vms: Dict[str, VMRec] = {}
         self.gpus = ["0000:65:00.0"]  # scaffold
+        self._tasks = set() # background work we must keep a reference to
+        self.forkpoints = ForkPoints()
+        self.janitor = Janitor(self.forkpoints)
+        self.flattener = Flattener(self)
+        self.agents = Agents()
+        self.exited: Set[str] = set() # VMs whose QEMU died on its own, until ReportInventory tells the controller
+        supervisor.on_exit = self._vm_exited
+
+    def _background(self, coro):
+        t = asyncio.create_task(coro)
+        self._tasks.add(t)
+        t.add_done_callback(self._tasks.discard)
+        return t
+
+    def _vm_exited(self, vm_id: str, status: int):
+        rec = self.vms.get(vm_id)
+        if not rec:
+            return
+        rec.exit_status = status
+        if rec.state != "DESTROYING":
+            log.error(f'{vm_id} QEMU exited unexpectedly (status {status}) while {rec.state}')
+            rec.state = "EXITED"
+            self._background(self._reap(rec))
+
+    async def _reap(self, rec: VMRec):
+        # nothing left to run: give back what the VM held, as Destroy would, and report it gone
+        self.exited.add(rec.id)
+        await self._destroy(rec.id)
+        await rec.qmp.close()
+
+    def _hold(self, vm_id: str, backing: str):
+        # before a VM's disk is made on `backing`: from then on that layer must stay put, even if
+        # its VM is destroyed while this one is still starting (_discard lets go on failure)
+        self.forkpoints.ref(backing, vm_id)
+
+    def _track(self, rec: VMRec, backing: str):
+        # a new VM is up: hostd owns it from here
+        rec.backing = backing
+        self.vms[rec.id] = rec
+        self._save_meta(rec)
+
+    async def _discard(self, rec: VMRec):
+        # a VM that didn't make it (failed or abandoned spawn/restore): fence its QEMU if one
+        # started, and give back its CID, its hold on a fork point and its files
+        self.vms.pop(rec.id, None)
+        await supervisor.stop(rec.id)
+        await rec.qmp.close()
+        await self.agents.close(rec.id)
+        self.janitor.collect(rec.id)
+        self.janitor.release(rec.id)
+
+    def _save_meta(self, rec: VMRec):
+        # vm.json: what a restarted hostd can't get back from QEMU itself (see readopt)
+        recovery.write_meta(rec.id, {
+            "gpu_bdf": rec.gpu_bdf, "cid": rec.cid, "backing": rec.backing, "fork_image": rec.fork_image,
+            "ram": rec.ram, "ram_shared": rec.ram_shared,
+            "disk_gen": rec.disk_gen, "top_node": rec.top_node, "top_file": str(rec.top_file),
+            "fork_points": [[fp.gen, fp.overlay, fp.writes] for fp in self.forkpoints.of(rec.id)],
+        })
+
+    async def readopt(self):
+        """Startup: take back the QEMUs an earlier hostd left running (they're in their own
+        sessions, so they outlive it). Each VM dir under HC_HOME is checked in parallel: a valid
+        pidfile, a QMP session, its run state; its VMRec and fork points come back from
+        vm.json. Dirs whose QEMU is gone go to the janitor, which still keeps any whose layers
+        back a live VM or a saved image."""
+        t0 = time.monotonic()
+        found = await asyncio.get_running_loop().run_in_executor(None, recovery.scan)
+        # every layer anything could still be backed by, dead VMs' included, before anything is collected
+        for vm_id, meta, _ in found:
+            for gen, overlay, writes in meta.get("fork_points", ()):
+                self.forkpoints.add(vm_id, gen, overlay, writes)
+                storage.backend.remember(overlay)
+        for snap_id, overlay in recovery.saved_images():
+            self.forkpoints.ref(overlay, snap_id)
+
+        sem = asyncio.Semaphore(recovery.ADOPT_PARALLEL)
+        async def adopt(vm_id: str, meta: dict, pid: int) -> VMRec:
+            if pid is None:
+                return None
+            async with sem:
+                supervisor.adopt(vm_id, pid)
+                rec = VMRec(vm_id, meta.get("gpu_bdf", ""), cid=meta.get("cid"))
+                rec.fork_image = meta.get("fork_image") or {}
+                rec.ram, rec.ram_shared = meta.get("ram", rec.ram), meta.get("ram_shared", rec.ram_shared)
+                rec.disk_gen = meta.get("disk_gen", 0)
+                rec.top_node = meta.get("top_node", rec.top_node)
+                rec.top_file = pathlib.Path(meta.get("top_file", rec.top_file))
+                try:
+                    status = (await asyncio.wait_for(rec.qmp.execute("query-status"), recovery.QMP_TIMEOUT))["status"]
+                except Exception as e:
+                    status = f"unreachable ({e or type(e).__name__})"
+                # postmigrate: stopped after a save (SaveVM of a paused VM, hot-fork templates)
+                if status in ("running", "paused", "prelaunch", "postmigrate"):
+                    rec.state = "TEMPLATE" if rec.fork_image else "RUNNING" if status == "running" else "PAUSED_WARM"
+                else:
+                    # mid-restore, crashed guest, hung QEMU...: nothing we can hand out
+                    log.error(f"readopt -- {vm_id}: QEMU pid {pid} is {status}, stopping it")
+                    await supervisor.stop(vm_id, rec.qmp if rec.qmp.connected else None)
+                    await rec.qmp.close()
+                    return None
+                return rec
+
+        recs = await asyncio.gather(*(adopt(*f) for f in found))
+        dead = []
+        for (vm_id, meta, _), rec in zip(found, recs):
+            if rec is None:
+                dead.append(vm_id)
+                continue
+            self.agents.adopt(vm_id, rec.cid)
+            self._hold(vm_id, meta.get("backing"))
+            self._track(rec, meta.get("backing"))
+            if rec.state == "RUNNING":
+                await self.agents.warm(vm_id)
+        self.exited.update(dead)
+        for vm_id in dead + recovery.stray_ram({vm_id for vm_id, _, _ in found}):
+            self.janitor.collect(vm_id)
+        log.info(f"readopt -- {len(self.vms)} VMs adopted, {len(dead)} dead dirs to the janitor "
+                 f"({time.monotonic() - t0:.2f}s)")
 
     async def ReportInventory(self, request: pb.Empty, context) -> pb.InventoryResp:
-        return pb.InventoryResp(host=self.host, cpus=64, mem_bytes=512<<30, gpus_bdf=self.gpus)
+        exited, self.exited = self.exited, set()
+        return pb.InventoryResp(host=self.host, cpus=64, mem_bytes=512<<30, gpus_bdf=self.gpus, shared_storage=SHARED_STORAGE,
+                                exited_vms=sorted(exited))
 
     async def BindGpuToVfio(self, request: pb.GpuBDF, context) -> pb.Empty:
         log.info("bind %s to vfio-pci (scaffold)", request.bdf)
@@ -43,16 +197,77 @@ class Hostd(rpc.HostdAPIServicer):
         return pb.Empty()
 
     async def SpawnWarm(self, request: pb.HostSpawnWarmReq, context) -> pb.HostSpawnWarmResp:
-        o = getattr(request, 'snapshot', None)
+        o = dict(request.snapshot)
         log.info(f'SpawnWarm called -- {o}')
         vmid = new_id()
-        await start_qemu(vmid, request.gpu_bdf, overlays=o)
+        rec = VMRec(vmid, request.gpu_bdf, cid=self.agents.allocate(vmid), overlays=o)
+        self._hold(vmid, o.get('overlay'))
+        try:
+            start_qemu(vmid, request.gpu_bdf, overlays=o, cid=rec.cid)
+            with PHASE.labels("qmp_ready").time():
+                await rec.qmp.ready() # waits for qmp.sock to show up
+            if o.get('vmstate'):
+                await self._incoming(rec, o)
+        except BaseException as e:
+            SPAWN_FAILURES.labels("SpawnWarm", type(e).__name__).inc()
+            await self._discard(rec)
+            raise
+        self._track(rec, o.get('overlay'))
+        return pb.HostSpawnWarmResp(vm_id=vmid)
 
-        # if you try this now, there is a race condition; the qmp.sock file hasn't been created yet!
-        # qmp = QMP(vmid); qmp.cont()
+    async def SpawnWarmBatch(self, request: pb.HostSpawnWarmBatchReq, context):
+        # N overlays written in-process, N QEMUs exec'd straight from the supervisor; vm_ids
+        # stream back as each answers on QMP, so the caller isn't held up by the slowest VM
+        o = dict(request.snapshot)
+        count = request.count
+        log.info(f'SpawnWarmBatch called -- count={count} {o}')
+        recs = []
+        for i in range(count):
+            vmid = new_id()
+            bdf = request.gpu_bdfs[i % len(request.gpu_bdfs)] if request.gpu_bdfs else ""
+            recs.append(VMRec(vmid, bdf, cid=self.agents.allocate(vmid), overlays=o))
+            self._hold(vmid, o.get('overlay'))
 
-        self.vms[vmid] = VMRec(vmid, request.gpu_bdf)
-        return pb.HostSpawnWarmResp(vm_id=vmid)
+        sem = asyncio.Semaphore(request.parallel or max(1, count))
+
+        async def one(i: int, rec: VMRec):
+            async with sem:
+                try:
+                    launch_qemu(rec.id, rec.gpu_bdf, o, rec.cid)
+                    with PHASE.labels("qmp_ready").time():
+                        await rec.qmp.ready()
+                    if o.get('vmstate'):
+                        await self._incoming(rec, o)
+                except Exception as e:
+                    return i, rec, e
+            return i, rec, None
+
+        settled = set() # vm_ids handed back to the caller (or already cleaned up)
+        tasks = []
+        try:
+            create_overlays([rec.id for rec in recs], overlays=o)
+            tasks = [asyncio.create_task(one(i, rec)) for i, rec in enumerate(recs)]
+            for fut in asyncio.as_completed(tasks):
+                i, rec, err = await fut
+                settled.add(rec.id)
+                if err:
+                    log.error(f"SpawnWarmBatch -- {rec.id} failed: {err}")
+                    SPAWN_FAILURES.labels("SpawnWarmBatch", type(err).__name__).inc()
+                    await self._discard(rec)
+                    yield pb.HostSpawnWarmResp(vm_id=rec.id, error=str(err), index=i)
+                    continue
+                self._track(rec, o.get('overlay'))
+                yield pb.HostSpawnWarmResp(vm_id=rec.id, index=i)
+        finally:
+            # the caller went away (or the overlays couldn't be made): whatever it wasn't told
+            # about is nobody's, so it goes -- launched or not
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            left = [rec for rec in recs if rec.id not in settled]
+            if left:
+                log.info(f"SpawnWarmBatch -- abandoned, cleaning up {len(left)} VMs")
+                await asyncio.gather(*(self._discard(rec) for rec in left))
 
     async def AcquireWarm(self, request: pb.HostAcquireWarmReq, context) -> pb.HostAcquireWarmResp:
         for vid, v in self.vms.items():
@@ -61,88 +276,259 @@ class Hostd(rpc.HostdAPIServicer):
         context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "no warm VMs")
 
     async def FastRestore(self, request: pb.HostFastRestoreReq, context) -> pb.HostFastRestoreResp:
+        # request.overlay comes from SaveVM: a frozen disk plus a vmstate image. QEMU starts
+        # with -incoming and reads the image instead of booting; with no vmstate it's a cold boot
+        o = dict(request.overlay)
+        memory = o.get('memory')
+        recording = False
+        if memory:
+            # lazy image: RAM is the snapshot's memory file mapped privately, so nothing is read
+            # up front and pages fault in as the guest touches them. Pull in the pages earlier
+            # restores touched in bulk, or record them this time round if nobody has yet.
+            if not await workingset.prefetch(memory):
+                workingset.start_recording(memory)
+                recording = True
         vmid = new_id()
-        await start_qemu(vmid, request.gpu_bdf)
-        qmp = QMP(vmid)
-        await qmp.cont()
-        self.vms[vmid] = VMRec(vmid, request.gpu_bdf)
+        rec = VMRec(vmid, request.gpu_bdf, cid=self.agents.allocate(vmid), overlays=o)
+        self._hold(vmid, o.get('overlay'))
+        try:
+            start_qemu(vmid, request.gpu_bdf, overlays=o, cid=rec.cid)
+            with PHASE.labels("qmp_ready").time():
+                await rec.qmp.ready()
+            if o.get('vmstate'):
+                await self._incoming(rec, o)
+            await rec.qmp.cont()
+        except BaseException as e:
+            SPAWN_FAILURES.labels("FastRestore", type(e).__name__).inc()
+            if recording:
+                workingset.cancel_recording(memory)
+            await self._discard(rec)
+            raise
+        rec.state = "RUNNING"
+        self._track(rec, o.get('overlay'))
+        await self.agents.warm(vmid)
+        if recording:
+            self._background(workingset.finish_recording(memory))
         return pb.HostFastRestoreResp(vm_id=vmid)
 
+    async def SaveVM(self, request: pb.HostSaveReq, context) -> pb.HostSaveResp:
+        rec = self.vms.get(request.vm_id)
+        if not rec:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        if rec.state == "TEMPLATE":
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "vm is a hot-fork template")
+        snap_id = new_id()
+        sdir = SNAP_DIR/snap_id
+        sdir.mkdir(parents=True, exist_ok=True)
+        vmstate = (sdir/"vmstate").resolve()
+        async with rec.lock:
+            was_running = rec.state == "RUNNING"
+            t0 = time.perf_counter()
+            await rec.qmp.stop()
+            try:
+                image = await self._freeze_disk(rec)
+                # a VM mapping its RAM privately has no file that is its memory (copy-on-write
+                # pages live only inside QEMU), so there's nothing to hand restores: save it whole
+                lazy = request.lazy and rec.ram_shared
+                if request.lazy and not lazy:
+                    log.info(f'SaveVM -- {rec.id} maps its RAM privately, saving it non-lazy')
+                if lazy:
+                    # RAM goes out as its own plain file (restores map it and page in on demand);
+                    # the vmstate then only needs device state
+                    memory = (sdir/"memory").resolve()
+                    await asyncio.get_running_loop().run_in_executor(None, workingset.copy_sparse, rec.ram, memory)
+                    await rec.qmp.migrate(f"file:{vmstate}", caps=["x-ignore-shared"])
+                    image.update(memory=str(memory), migrate_caps="x-ignore-shared")
+                else:
+                    # mapped-ram: each RAM page goes to a fixed offset in the file, so the image is
+                    # written and read back with plain positioned I/O instead of a parsed stream
+                    await rec.qmp.migrate(f"file:{vmstate}", caps=["mapped-ram"])
+                    image.update(migrate_caps="mapped-ram")
+            finally:
+                if was_running:
+                    await rec.qmp.cont()
+                    PHASE.labels("parent_pause").observe(time.perf_counter() - t0)
+        image.update(vmstate=str(vmstate))
+        self.forkpoints.ref(image['overlay'], snap_id) # saved images keep their disk layer forever
+        recovery.write_image(snap_id, image) # ...including across a hostd restart
+        log.info(f'SaveVM -- {rec.id} saved as {snap_id}: {image}')
+        return pb.HostSaveResp(snapshot_id=snap_id, overlay=image)
+
     async def Unpause(self, request: pb.VMId, context) -> pb.Empty:
-        qmp = QMP(request.vm_id)
-        await qmp.cont()
-        self.vms[request.vm_id].state = "RUNNING"
+        rec = self.vms.get(request.vm_id)
+        if rec is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm") # e.g. reaped after its QEMU died
+        if rec.state == "TEMPLATE":
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "vm is a hot-fork template")
+        await self._unpause(request.vm_id)
         return pb.Empty()
 
     async def Pause(self, request: pb.VMId, context) -> pb.Empty:
-        qmp = QMP(request.vm_id)
-        await qmp.stop()
-        self.vms[request.vm_id].state = "PAUSED_WARM"
+        rec = self.vms.get(request.vm_id)
+        if rec and rec.state == "TEMPLATE":
+            await context.abort(grpc.StatusCode.FAILED_PRECONDITION, "vm is a hot-fork template")
+        await self._pause(request.vm_id)
         return pb.Empty()
 
     async def Destroy(self, request: pb.VMId, context) -> pb.Empty:
-        # Scaffold: would signal QEMU to quit and delete overlay
-        self.vms.pop(request.vm_id, None)
-        qmp = QMP(request.vm_id)
-        await qmp.kill()
-        await destroy_qemu(request.vm_id)
+        await self._destroy(request.vm_id)
         return pb.Empty()
 
+    async def _unpause(self, vm_id: str):
+        rec = self.vms.get(vm_id)
+        if not rec:
+            raise LookupError("unknown vm")
+        if rec.state == "TEMPLATE":
+            raise RuntimeError("vm is a hot-fork template")
+        await rec.qmp.cont()
+        rec.state = "RUNNING"
+        await self.agents.warm(vm_id) # running guests can take a connect; open its channels now
+
+    async def _pause(self, vm_id: str):
+        rec = self.vms.get(vm_id)
+        if not rec:
+            raise LookupError("unknown vm")
+        if rec.state == "TEMPLATE":
+            # already stopped for good; as PAUSED_WARM it could be handed out and run, writing
+            # to the RAM file its children map
+            raise RuntimeError("vm is a hot-fork template")
+        await rec.qmp.stop()
+        rec.state = "PAUSED_WARM"
+
+    async def _destroy(self, vm_id: str):
+        # returns once the VM is fenced (its QEMU is gone); the files are the janitor's job
+        rec = self.vms.pop(vm_id, None)
+        if rec:
+            rec.state = "DESTROYING"
+        status = await supervisor.stop(vm_id, rec and rec.qmp) # quit, then SIGTERM, then SIGKILL
+        log.info(f'Destroy -- {vm_id} QEMU gone, status {status}')
+        await self.agents.close(vm_id)
+        self.janitor.collect(vm_id) # held back while children still read its frozen layers
+        self.janitor.release(vm_id)
+
+    async def _bulk(self, request: pb.VMIdList, op, what: str) -> pb.BulkResp:
+        # one RPC for any number of VMs; at most `parallel` of them in flight
+        sem = asyncio.Semaphore(request.parallel or BULK_PARALLEL)
+        async def one(vm_id: str) -> pb.VMResult:
+            async with sem:
+                try:
+                    await op(vm_id)
+                    return pb.VMResult(vm_id=vm_id, host=self.host)
+                except Exception as e:
+                    log.error(f'{what} -- {vm_id}: {e}')
+                    return pb.VMResult(vm_id=vm_id, host=self.host, error=str(e) or type(e).__name__)
+        results = await asyncio.gather(*(one(v) for v in request.vm_ids))
+        log.info(f'{what} -- {len(results)} VMs, {sum(1 for r in results if r.error)} failed')
+        return pb.BulkResp(results=results)
+
+    async def PauseMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        return await self._bulk(request, self._pause, "PauseMany")
+
+    async def UnpauseMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        return await self._bulk(request, self._unpause, "UnpauseMany")
+
+    async def DestroyMany(self, request: pb.VMIdList, context) -> pb.BulkResp:
+        return await self._bulk(request, self._destroy, "DestroyMany")
+
     async def Exec(self, request: pb.HostExecReq, context) -> pb.ExecResp:
-        # Scaffold: would call guest-agent inside the VM; placeholder runs locally
-        proc = await asyncio.create_subprocess_exec(*request.argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        try:
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=max(1, request.timeout_sec))
-        except asyncio.TimeoutError:
-            proc.kill(); return pb.ExecResp(exit_code=124, stdout=b"", stderr=b"timeout")
-        return pb.ExecResp(exit_code=proc.returncode, stdout=stdout, stderr=stderr)
+        # runs inside the guest: the agent, over the VM's warm vsock channels
+        if request.vm_id not in self.vms:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        stub = await self.agents.stub(request.vm_id)
+        return await stub.Exec(request, timeout=max(1, request.timeout_sec) + EXEC_GRACE, wait_for_ready=True)
+
+    async def ExecStream(self, request_iterator, context):
+        first = await anext(request_iterator, None)
+        if first is None:
+            return
+        if first.vm_id not in self.vms:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        stub = await self.agents.stub(first.vm_id)
+        start = lambda inputs: stub.ExecStream(inputs, wait_for_ready=True)
+        async with aclosing(relay(first, request_iterator, start)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    async def _freeze_disk(self, rec: VMRec) -> Dict[str, str]:
+        # caller holds rec.lock. Freeze the VM's disk as it is now into a fork point that
+        # children (and saved images) are made from. The host's storage backend decides how:
+        # an atomic external snapshot that leaves the parent running on a fresh top layer, or a
+        # reflink clone of its image (storage.py). Either way the cost doesn't grow with disk size.
+        # If the guest hasn't written since the last freeze, that layer is still its current
+        # disk: reuse it rather than stacking another (empty) one on the chain.
+        writes = await rec.qmp.disk_writes()
+        fp = self.forkpoints.reusable(rec.id, writes)
+        if fp:
+            log.info(f'freeze disk -- {rec.id} unchanged since gen={fp.gen}, reusing {fp.overlay}')
+            return {'overlay': fp.overlay}
+        await self.flattener.preempt(rec) # a flatten job on the top would block the snapshot
+        gen = rec.disk_gen + 1
+        t0 = time.monotonic()
+        frozen = await storage.backend.freeze(rec, gen)
+        rec.disk_gen = gen
+        self.forkpoints.add(rec.id, gen, frozen, writes)
+        self._save_meta(rec)
+        PHASE.labels("freeze_disk").observe(time.monotonic() - t0)
+        log.info(f'freeze disk -- {rec.id} gen={gen} frozen={frozen} via {storage.backend.name} ({(time.monotonic() - t0) * 1e3:.2f}ms)')
+        return {'overlay': frozen}
 
     async def GetOverlays(self, request: pb.OverlayReq, context) -> pb.OverlayResp:
-        vm_id = request.vm_id
-        device_path = pathlib.Path(HC_HOME)/vm_id 
-        device = [('overlay', f'{str(device_path.resolve())}/vm-001.overlay-top.qcow2')]
-
-        qmp = QMP(request.vm_id)
-        await qmp.stop()
-        # Step 1: Put the VM to sleep
-
-        # res = await qmp.snapshot_disks(pairs=device)
-        # this isn't working for right now
-
-        source_path = "vm-001.overlay.qcow2"
-        vdir = pathlib.Path(HC_HOME)/vm_id #source_path
-        parent_overlay = device[0][1]
-        overlay_cmd = (
-            "qemu-img create -f qcow2 -F qcow2 "
-            "-b {vdir}/vm-001.overlay.qcow2 "
-            "{parent_overlay} "
-        ).format(vdir=str(vdir.resolve()), parent_overlay=parent_overlay)
-        log.info(f'GetOverlays -- {request.vm_id} cmd={overlay_cmd}')
-        # Step 2: Get a VM image snapshot
-
-        import time, os
-        interval = 0.01
-        deadline = time.time() + 5.0 # 5 seconds may be too much
-        last_err = None
-        path = f"{HC_HOME}/{vm_id}/vm-001.overlay.qcow2"
-        while time.time() < deadline:
-            try:
-                if os.path.exists(path):
-                    proc = await asyncio.create_subprocess_shell(overlay_cmd)
-                    stdout, stderr = await proc.communicate() # actually do step #2
-                    break
-            except FileNotFoundError as e:
-                last_err = e
-            await asyncio.sleep(interval)
+        rec = self.vms.get(request.vm_id)
+        if not rec:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        async with rec.lock:
+            if rec.state == "TEMPLATE":
+                # a template's disk stopped changing when it was frozen; hand out that layer
+                return pb.OverlayResp(overlays={'overlay': rec.fork_image['overlay']})
+            overlays = await self._freeze_disk(rec)
+        return pb.OverlayResp(overlays=overlays)
 
-        await qmp.cont()
-        # Step 3: re-awaken the parent VM
+    async def PrepareHotFork(self, request: pb.OverlayReq, context) -> pb.OverlayResp:
+        rec = self.vms.get(request.vm_id)
+        if not rec:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "unknown vm")
+        async with rec.lock:
+            if rec.state != "TEMPLATE":
+                # The parent stops for good: its RAM file is what the children map, so it may
+                # never write to it again. With x-ignore-shared the save skips that RAM and
+                # only writes device state, so this costs the same for 1 GB or 100 GB guests.
+                # A VM whose RAM is a private mapping (itself a hot-fork child, or a lazy
+                # restore) has no file holding its memory: that one saves all of its RAM into
+                # the vmstate, and its children load it into RAM files of their own.
+                t0 = time.perf_counter()
+                await rec.qmp.stop()
+                fork_image = await self._freeze_disk(rec)
+                vmstate = (BASE_DIR/rec.id/"vmstate").resolve()
+                if rec.ram_shared:
+                    await rec.qmp.migrate(f"file:{vmstate}", caps=["x-ignore-shared"])
+                    fork_image.update(memory=rec.ram, vmstate=str(vmstate), migrate_caps="x-ignore-shared")
+                else:
+                    await rec.qmp.migrate(f"file:{vmstate}", caps=["mapped-ram"])
+                    fork_image.update(vmstate=str(vmstate), migrate_caps="mapped-ram")
+                PHASE.labels("template_prepare").observe(time.perf_counter() - t0)
+                rec.fork_image = fork_image
+                rec.state = "TEMPLATE"
+                self._save_meta(rec)
+                log.info(f'PrepareHotFork -- {rec.id} is now a template: {fork_image}')
+        return pb.OverlayResp(overlays=rec.fork_image)
 
-        return pb.OverlayResp(overlays={device[0][0]: device[0][1]})
+    async def _incoming(self, rec: VMRec, o: Dict[str, str]):
+        # QEMU was started with -incoming defer; load the saved device (and maybe RAM) state
+        caps = [c for c in o.get('migrate_caps', '').split(',') if c]
+        with PHASE.labels("incoming").time():
+            await rec.qmp.migrate_incoming(f"file:{o['vmstate']}", caps=caps)
 
 async def serve():
     server = grpc.aio.server()
-    rpc.add_HostdAPIServicer_to_server(Hostd(), server)
+    storage.select(BASE_DIR)
+    hostd = Hostd()
+    hostd.flattener.start()
+    hostd.janitor.start()
+    vm_stash.start()
+    vm_stash.configure(BASE_IMAGE)
+    await hostd.readopt() # before serving: the controller may ask about VMs we had
+    await metrics.serve(METRICS_PORT)
+    rpc.add_HostdAPIServicer_to_server(hostd, server)
     server.add_insecure_port("[::]:50052")
     log.info("hostd listening :50052")
     await server.start()
@@ -0,0 +1,104 @@
+# =====================================================
+# hostd/stash.py (pre-staged VM dirs, overlay already made)
+# =====================================================
+import asyncio, os, pathlib, shutil
+from collections import deque
+from typing import Deque, Dict
+
+from common.logs import setup
+from common.ids import new_id
+from common.symbols import HC_HOME
+import storage
+
+log = setup("hostd.stash")
+
+STASH_DIR = pathlib.Path(HC_HOME) / "stash"
+OVERLAY = "vm-001.overlay.qcow2"
+DEFAULT_DEPTH = int(os.environ.get("HC_STASH_DEPTH", "4")) # ready dirs kept per backing file
+POPULAR_AFTER = 2  # spawns from one backing file before it gets a stash of its own
+REFILL_SECS = 5.0  # refill at least this often even if nobody claimed anything
+
+class Stash:
+    """Ready-made VM directories, each already holding a fresh disk on some backing file
+    (the base image, busy fork points): an empty overlay, or a reflink clone (storage.py). A spawn renames one into place as HC_HOME/<vm_id>, so
+    the mkdir + overlay write is off its critical path; a background task tops each backing's
+    stash back up to its depth. Overlays here use absolute backing paths, so an entry is valid
+    wherever it's renamed to. Entries don't survive a hostd restart (start() clears them)."""
+    def __init__(self, root: pathlib.Path = STASH_DIR):
+        self.root = root
+        self.depth: Dict[str, int] = {} # backing -> how many ready dirs to keep
+        self.ready: Dict[str, Deque[pathlib.Path]] = {}
+        self.spawns: Dict[str, int] = {} # backing -> spawns seen, for picking popular ones
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.task = asyncio.create_task(self.run())
+
+    def configure(self, backing: str, depth: int = DEFAULT_DEPTH):
+        """Keep `depth` dirs ready on `backing`; 0 drops its stash."""
+        if depth <= 0:
+            return self.retire(backing)
+        self.depth[backing] = depth
+        self.ready.setdefault(backing, deque())
+        self.wake.set()
+
+    def note(self, backing: str):
+        # a backing file that keeps getting spawned from earns a stash
+        n = self.spawns[backing] = self.spawns.get(backing, 0) + 1
+        if n >= POPULAR_AFTER and backing not in self.depth:
+            log.info(f"stash: {backing} is popular, stashing {DEFAULT_DEPTH}")
+            self.configure(backing, DEFAULT_DEPTH)
+
+    def claim(self, backing: str, vdir: pathlib.Path) -> bool:
+        """Move a ready dir on `backing` to vdir. False if none is ready (make it yourself)."""
+        ready = self.ready.get(backing)
+        while ready:
+            entry = ready.popleft()
+            try:
+                os.rename(entry, vdir) # same filesystem: atomic, whatever the overlay's size
+            except OSError as e:
+                log.error(f"stash: claim {entry} -> {vdir} failed: {e}")
+                continue
+            self.wake.set()
+            return True
+        return False
+
+    def retire(self, backing: str):
+        """`backing` is going away: forget it and delete the dirs staged on it."""
+        self.depth.pop(backing, None)
+        self.spawns.pop(backing, None)
+        for entry in self.ready.pop(backing, ()):
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def retire_under(self, d: pathlib.Path):
+        # every backing that lives in directory d (a destroyed VM's fork points)
+        prefix = str(pathlib.Path(d).resolve()) + os.sep
+        for backing in [b for b in self.spawns.keys() | self.depth.keys() if b.startswith(prefix)]:
+            self.retire(backing)
+
+    def _stage(self, backing: str) -> pathlib.Path:
+        entry = self.root / new_id()
+        entry.mkdir()
+        storage.backend.make_disk(entry / OVERLAY, backing)
+        return entry
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), REFILL_SECS)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            for backing, depth in list(self.depth.items()):
+                ready = self.ready.setdefault(backing, deque())
+                try:
+                    while len(ready) < depth and backing in self.depth:
+                        ready.append(self._stage(backing))
+                        await asyncio.sleep(0) # let claims and RPCs in between entries
+                except OSError as e:
+                    log.error(f"stash: can't stage on {backing}: {e}")
+
+vm_stash = Stash()
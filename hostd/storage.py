@@ -0,0 +1,103 @@
+# =====================================================
+# hostd/storage.py (fork storage backends: qcow2 layers or reflinks)
+# =====================================================
+import fcntl, os, pathlib, tempfile, time
+from typing import Set
+
+from common.logs import setup
+from common.metrics import PHASE
+import qcow2
+
+log = setup("hostd.storage")
+
+FICLONE = 0x40049409 # _IOW(0x94, 9, int) from <linux/fs.h>
+
+def reflink(src, dst) -> None:
+    """Make dst a copy-on-write clone of src: shares all of src's extents, so it's O(1) in
+    the file's size. Raises OSError (EOPNOTSUPP/EXDEV/...) where the filesystem can't."""
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        fcntl.ioctl(fo.fileno(), FICLONE, fi.fileno())
+
+def reflink_supported(d) -> bool:
+    """Try FICLONE between two scratch files in d (btrfs, XFS with reflink=1, bcachefs...)."""
+    d = pathlib.Path(d)
+    d.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=d) as tmp:
+        src, dst = os.path.join(tmp, "a"), os.path.join(tmp, "b")
+        with open(src, "wb") as f:
+            f.write(b"\0" * 4096)
+        try:
+            reflink(src, dst)
+        except OSError:
+            return False
+    return True
+
+class Qcow2Overlays:
+    """Fork = freeze the parent's top layer (atomic external snapshot, no pause) and give each
+    child an empty qcow2 on top of it. Works anywhere; chains get one layer deeper per fork."""
+    name = "qcow2"
+
+    async def freeze(self, rec, gen: int) -> str:
+        top_file = (rec.top_file.parent/f"vm-001.overlay.{gen}.qcow2").resolve()
+        top_node = f"overlay-{gen}"
+        frozen = rec.top_file.resolve()
+        await rec.qmp.snapshot_disks([(rec.top_node, top_file, top_node)])
+        rec.top_node, rec.top_file = top_node, top_file
+        # QEMU wrote the frozen layer's backing name as it opened it; children open it from
+        # elsewhere, so make sure the whole chain under it still resolves
+        qcow2.check_chain(frozen)
+        return str(frozen)
+
+    def make_disk(self, path, backing: str) -> None:
+        qcow2.create_overlay(path, backing)
+
+    def remember(self, frozen: str) -> None:
+        """A fork point made before a hostd restart (recovery)."""
+
+class ReflinkClones(Qcow2Overlays):
+    """Fork = reflink the parent's whole top image into a fork point, and reflink that again for
+    each child. A child's disk is a full image of its own (chain depth 1: just the base image
+    under it) and the parent's chain doesn't grow. The parent is stopped for the clone, which
+    is what makes QEMU drain and flush its image; FICLONE costs O(extents), not O(size).
+    The base image itself still gets a qcow2 overlay on top."""
+    name = "reflink"
+
+    def __init__(self):
+        self.images: Set[str] = set() # fork points we cloned, i.e. what make_disk clones again
+
+    async def freeze(self, rec, gen: int) -> str:
+        frozen = (rec.top_file.parent/f"vm-001.fork.{gen}.qcow2").resolve()
+        running = (await rec.qmp.execute("query-status")).get("running")
+        if running:
+            t0 = time.perf_counter()
+            await rec.qmp.stop()
+        try:
+            reflink(rec.top_file, frozen)
+        finally:
+            if running:
+                await rec.qmp.cont()
+                PHASE.labels("parent_pause").observe(time.perf_counter() - t0)
+        self.images.add(str(frozen))
+        return str(frozen)
+
+    def remember(self, frozen: str) -> None:
+        if os.path.basename(frozen).startswith("vm-001.fork."):
+            self.images.add(frozen)
+
+    def make_disk(self, path, backing: str) -> None:
+        if backing in self.images:
+            reflink(backing, path)
+        else:
+            qcow2.create_overlay(path, backing)
+
+backend = Qcow2Overlays()
+
+def select(d, want: str = None) -> None:
+    """Pick this host's backend: HC_STORAGE=qcow2|reflink, or (default) reflink if d supports it."""
+    global backend
+    want = want or os.environ.get("HC_STORAGE", "auto")
+    if want == "reflink" or (want == "auto" and reflink_supported(d)):
+        backend = ReflinkClones()
+    else:
+        backend = Qcow2Overlays()
+    log.info(f"storage backend for {d}: {backend.name}")
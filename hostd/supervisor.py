@@ -0,0 +1,112 @@
+# =====================================================
+# hostd/supervisor.py (QEMU processes: launch, watch, stop)
+# =====================================================
+import asyncio, os, signal, subprocess
+from typing import Callable, Dict, List
+
+from common.logs import setup
+
+log = setup("hostd.supervisor")
+
+QUIT_GRACE = 3.0 # seconds QEMU gets to exit after QMP quit before SIGTERM
+TERM_GRACE = 2.0 # ...and after SIGTERM before SIGKILL
+
+class Proc:
+    def __init__(self, vm_id: str, pid: int, popen: subprocess.Popen = None):
+        self.vm_id = vm_id
+        self.pid = pid
+        self.popen = popen # None for a QEMU we didn't start (can't reap it, only watch it)
+        self.pidfd = None
+        self.status = None # exit code (negative: killed by that signal) once it's gone
+        self.exited = asyncio.get_running_loop().create_future()
+
+class Supervisor:
+    """Starts each QEMU straight from an argv list (no shell, no -daemonize) in its own session,
+    so it outlives a hostd restart, and watches it through a pidfd on the event loop: the exit
+    is seen the moment it happens, with its status, and no thread per child. on_exit(vm_id,
+    status) is called for every exit, expected or not."""
+    def __init__(self):
+        self.procs: Dict[str, Proc] = {}
+        self.on_exit: Callable[[str, int], None] = None
+
+    def launch(self, vm_id: str, argv: List[str], cwd=None, stderr_path=None) -> Proc:
+        err = open(stderr_path, "ab") if stderr_path else subprocess.DEVNULL
+        try:
+            popen = subprocess.Popen(argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                     stderr=err, start_new_session=True, close_fds=True)
+        finally:
+            if stderr_path:
+                err.close()
+        log.info(f"launched {vm_id}: pid {popen.pid}")
+        return self._watch(Proc(vm_id, popen.pid, popen))
+
+    def adopt(self, vm_id: str, pid: int) -> Proc:
+        """Watch a QEMU that's already running (e.g. started by an earlier hostd)."""
+        return self._watch(Proc(vm_id, pid))
+
+    def _watch(self, p: Proc) -> Proc:
+        self.procs[p.vm_id] = p
+        try:
+            p.pidfd = os.pidfd_open(p.pid)
+        except ProcessLookupError:
+            self._exited(p)
+            return p
+        asyncio.get_running_loop().add_reader(p.pidfd, self._exited, p)
+        return p
+
+    def _exited(self, p: Proc):
+        if p.pidfd is not None:
+            asyncio.get_running_loop().remove_reader(p.pidfd)
+            os.close(p.pidfd)
+            p.pidfd = None
+        if p.popen is not None:
+            p.status = p.popen.wait() # reaps it; the pidfd said it's gone, so this doesn't block
+        if self.procs.get(p.vm_id) is p:
+            del self.procs[p.vm_id]
+        log.info(f"{p.vm_id}: pid {p.pid} exited, status {p.status}")
+        if not p.exited.done():
+            p.exited.set_result(p.status)
+        if self.on_exit:
+            self.on_exit(p.vm_id, p.status)
+
+    def running(self, vm_id: str) -> bool:
+        return vm_id in self.procs
+
+    async def _wait(self, p: Proc, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(asyncio.shield(p.exited), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _signal(self, p: Proc, sig: int):
+        try:
+            # through the pidfd, so a recycled pid can never get the signal
+            signal.pidfd_send_signal(p.pidfd, sig) if p.pidfd is not None else os.kill(p.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    async def stop(self, vm_id: str, qmp=None) -> int:
+        """Make sure the VM's QEMU is gone: QMP quit (if given a session), then SIGTERM, then
+        SIGKILL. Returns its exit status (None if we never knew the process)."""
+        p = self.procs.get(vm_id)
+        if qmp is not None and (p is None or not p.exited.done()):
+            try:
+                await asyncio.wait_for(qmp.kill(), QUIT_GRACE)
+            except Exception as e:
+                log.error(f"{vm_id}: QMP quit failed: {e}")
+        if p is None:
+            return None
+        if qmp is not None:
+            if await self._wait(p, QUIT_GRACE):
+                return p.status
+            log.error(f"{vm_id}: still running {QUIT_GRACE}s after quit, SIGTERM")
+        self._signal(p, signal.SIGTERM)
+        if await self._wait(p, TERM_GRACE):
+            return p.status
+        log.error(f"{vm_id}: still running after SIGTERM, SIGKILL")
+        self._signal(p, signal.SIGKILL)
+        await p.exited
+        return p.status
+
+supervisor = Supervisor()
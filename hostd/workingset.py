@@ -0,0 +1,128 @@
+# =====================================================
+# hostd/workingset.py (lazy-restore page working sets)
+# =====================================================
+import asyncio, ctypes, ctypes.util, json, mmap, os
+
+from common.logs import setup
+
+log = setup("hostd.workingset")
+
+RECORD_SECS = 5.0 # how long after a restore we watch which pages the guest touches
+PAGE = mmap.PAGESIZE
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+_libc.mmap.restype = ctypes.c_void_p
+_libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+_libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+_libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+
+_recording = set() # memory files with a recorder running
+
+def wss_path(memory: str) -> str:
+    return memory + ".wss"
+
+def copy_sparse(src, dst) -> None:
+    """Copy src to dst, skipping holes (a guest's RAM file is mostly never-touched zeroes)."""
+    with open(src, "rb") as fi, open(dst, "wb") as fo:
+        size = os.fstat(fi.fileno()).st_size
+        fo.truncate(size)
+        off = 0
+        while off < size:
+            try:
+                data = os.lseek(fi.fileno(), off, os.SEEK_DATA)
+            except OSError:
+                break # nothing but hole from here on
+            hole = os.lseek(fi.fileno(), data, os.SEEK_HOLE)
+            os.lseek(fo.fileno(), data, os.SEEK_SET)
+            while data < hole:
+                # sendfile rather than copy_file_range: tmpfs -> disk is cross-device
+                data += os.sendfile(fo.fileno(), fi.fileno(), data, hole - data)
+            off = hole
+
+def resident_runs(memory: str):
+    """[(offset, length), ...] of the file's pages currently in the page cache."""
+    fd = os.open(memory, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if not size:
+            return []
+        addr = _libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), "mmap failed")
+        try:
+            vec = ctypes.create_string_buffer((size + PAGE - 1) // PAGE)
+            if _libc.mincore(addr, size, vec) != 0:
+                raise OSError(ctypes.get_errno(), "mincore failed")
+        finally:
+            _libc.munmap(addr, size)
+    finally:
+        os.close(fd)
+
+    runs, start = [], None
+    for i, b in enumerate(vec.raw):
+        if b & 1 and start is None:
+            start = i
+        elif not b & 1 and start is not None:
+            runs.append((start * PAGE, (i - start) * PAGE))
+            start = None
+    if start is not None:
+        runs.append((start * PAGE, (len(vec.raw) - start) * PAGE))
+    return runs
+
+def _prefetch(memory: str) -> bool:
+    try:
+        with open(wss_path(memory)) as f:
+            runs = json.load(f)
+    except FileNotFoundError:
+        return False
+    fd = os.open(memory, os.O_RDONLY)
+    try:
+        # WILLNEED queues readahead for the whole set at once; the guest's faults then hit cache
+        for off, length in runs:
+            os.posix_fadvise(fd, off, length, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+    log.info(f"prefetch {memory}: {len(runs)} runs, {sum(l for _, l in runs) >> 20} MiB")
+    return True
+
+async def prefetch(memory: str) -> bool:
+    """Start reading the recorded working set of `memory` into the page cache. False if
+    nothing has been recorded for it yet."""
+    return await asyncio.get_running_loop().run_in_executor(None, _prefetch, memory)
+
+def _evict(memory: str):
+    fd = os.open(memory, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def _save(memory: str, runs):
+    tmp = wss_path(memory) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(runs, f)
+    os.replace(tmp, wss_path(memory))
+
+def start_recording(memory: str) -> None:
+    """Call before the restoring QEMU maps the file: drops the file's clean cached pages so
+    that whatever is resident RECORD_SECS after resume is what this guest actually touched.
+    Always follow with finish_recording() (or cancel_recording() if the restore failed)."""
+    if memory in _recording:
+        return
+    _recording.add(memory)
+    _evict(memory)
+
+def cancel_recording(memory: str) -> None:
+    _recording.discard(memory)
+
+async def finish_recording(memory: str, delay: float = RECORD_SECS) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.sleep(delay)
+        runs = await loop.run_in_executor(None, resident_runs, memory)
+        await loop.run_in_executor(None, _save, memory, runs)
+        log.info(f"recorded working set of {memory}: {len(runs)} runs, {sum(l for _, l in runs) >> 20} MiB")
+    except OSError as e:
+        log.error(f"working set recording for {memory} failed: {e}")
+    finally:
+        _recording.discard(memory)
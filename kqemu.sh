@@ -1,3 +1,5 @@
 #!/usr/bin/env sh
 
-for i in `ps aux | grep qemu-system-x86_64 | awk '{print $2}' `; do kill $i; done
+# only the QEMUs hostd started (their pidfiles live in the VM dirs), not every qemu on the box
+HC_HOME=${HC_HOME:-.hypercomputer}
+for f in $HC_HOME/*/qemu.pid; do [ -f "$f" ] && kill `cat $f`; done
@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapi.proto\x12\x06\x64\x65vbox\"\x07\n\x05\x45mpty\"8\n\x05Shape\x12\x0c\n\x04vcpu\x18\x01 \x01(\x05\x12\x0e\n\x06ram_gb\x18\x02 \x01(\x05\x12\x11\n\tgpu_model\x18\x03 \x01(\t\"\x19\n\x0bSnapshotRef\x12\n\n\x02id\x18\x01 \x01(\t\"H\n\x08VMHandle\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\x12\n\n\x02ip\x18\x03 \x01(\t\x12\x13\n\x0bssh_key_ref\x18\x04 \x01(\t\"\x19\n\x06PoolId\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\"+\n\x08PoolSpec\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\ttenant_id\x18\x02 \x01(\t\"B\n\x04Pool\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\ttenant_id\x18\x03 \x01(\t\x12\r\n\x05hosts\x18\x04 \x03(\t\"$\n\x11ListPoolsHostsReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\"#\n\x12ListPoolsHostsResp\x12\r\n\x05hosts\x18\x01 \x03(\t\",\n\rListPoolsResp\x12\x1b\n\x05pools\x18\x01 \x03(\x0b\x32\x0c.devbox.Pool\"/\n\rCreatePoolReq\x12\x1e\n\x04spec\x18\x01 \x01(\x0b\x32\x10.devbox.PoolSpec\",\n\x0e\x43reatePoolResp\x12\x1a\n\x04pool\x18\x01 \x01(\x0b\x32\x0c.devbox.Pool\"0\n\nAddHostReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\x12\x11\n\thost_addr\x18\x02 \x01(\t\".\n\rRemoveHostReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\"y\n\x11\x45nsureWarmPoolReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x0e\n\x06target\x18\x02 \x01(\x05\x12%\n\x08snapshot\x18\x03 \x01(\x0b\x32\x13.devbox.SnapshotRef\x12\x0f\n\x07pool_id\x18\x04 \x01(\t\"%\n\x12\x45nsureWarmPoolResp\x12\x0f\n\x07\x63urrent\x18\x01 \x01(\x05\"*\n\nAcquireReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\"+\n\x0b\x41\x63quireResp\x12\x1c\n\x02vm\x18\x01 \x01(\x0b\x32\x10.devbox.VMHandle\",\n\nReleaseReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0f\n\x07recycle\x18\x02 \x01(\x08\";\n\x07\x45xecReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x02 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x03 \x01(\x05\"=\n\x08\x45xecResp\x12\x11\n\texit_code\x18\x01 \x01(\x05\x12\x0e\n\x06stdout\x18\x02 \x01(\x0c\x12\x0e\n\x06stderr\x18\x03 \x01(\x0c\"\x1c\n\nHealthResp\x12\x0e\n\x06status\x18\x01 \x01(\t\"c\n\rInventoryResp\x12\x0c\n\x04host\x18\x01 \x01(\t\x12\x0c\n\x04\x63pus\x18\x02 \x01(\x05\x12\x11\n\tmem_bytes\x18\x03 \x01(\x03\x12\x10\n\x08gpus_bdf\x18\x04 \x03(\t\x12\x11\n\tgpus_numa\x18\x05 \x03(\x05\"\xac\x01\n\x10HostSpawnWarmReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x38\n\x08snapshot\x18\x02 \x03(\x0b\x32&.devbox.HostSpawnWarmReq.SnapshotEntry\x12\x0f\n\x07gpu_bdf\x18\x03 \x01(\t\x1a/\n\rSnapshotEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\"\n\x11HostSpawnWarmResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\"2\n\x12HostAcquireWarmReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\"$\n\x13HostAcquireWarmResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\"\xad\x01\n\x12HostFastRestoreReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x38\n\x07overlay\x18\x02 \x03(\x0b\x32\'.devbox.HostFastRestoreReq.OverlayEntry\x12\x0f\n\x07gpu_bdf\x18\x03 \x01(\t\x1a.\n\x0cOverlayEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"$\n\x13HostFastRestoreResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\"\x15\n\x04VMId\x12\r\n\x05vm_id\x18\x01 \x01(\t\"?\n\x0bHostExecReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x02 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x03 \x01(\x05\"\x15\n\x06GpuBDF\x12\x0b\n\x03\x62\x64\x66\x18\x01 \x01(\t\"M\n\x07\x46orkReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x10\n\x08how_many\x18\x02 \x01(\r\x12\x0e\n\x06pinned\x18\x03 \x01(\x08\x12\x11\n\tcold_fork\x18\x04 \x01(\x08\"\x1a\n\x08\x46orkResp\x12\x0e\n\x06vm_ids\x18\x01 \x03(\t\"\x1b\n\nOverlayReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\"s\n\x0bOverlayResp\x12\x33\n\x08overlays\x18\x01 \x03(\x0b\x32!.devbox.OverlayResp.OverlaysEntry\x1a/\n\rOverlaysEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x32\xf5\x03\n\rControllerAPI\x12;\n\nCreatePool\x12\x15.devbox.CreatePoolReq\x1a\x16.devbox.CreatePoolResp\x12\x31\n\tListPools\x12\r.devbox.Empty\x1a\x15.devbox.ListPoolsResp\x12\x46\n\rListPoolHosts\x12\x19.devbox.ListPoolsHostsReq\x1a\x1a.devbox.ListPoolsHostsResp\x12G\n\x0e\x45nsureWarmPool\x12\x19.devbox.EnsureWarmPoolReq\x1a\x1a.devbox.EnsureWarmPoolResp\x12\x32\n\x07\x41\x63quire\x12\x12.devbox.AcquireReq\x1a\x13.devbox.AcquireResp\x12,\n\x07Release\x12\x12.devbox.ReleaseReq\x1a\r.devbox.Empty\x12)\n\x04\x45xec\x12\x0f.devbox.ExecReq\x1a\x10.devbox.ExecResp\x12+\n\x06Health\x12\r.devbox.Empty\x1a\x12.devbox.HealthResp\x12)\n\x04\x46ork\x12\x0f.devbox.ForkReq\x1a\x10.devbox.ForkResp2\xcd\x04\n\x08HostdAPI\x12\x37\n\x0fReportInventory\x12\r.devbox.Empty\x1a\x15.devbox.InventoryResp\x12.\n\rBindGpuToVfio\x12\x0e.devbox.GpuBDF\x1a\r.devbox.Empty\x12)\n\x08GpuReset\x12\x0e.devbox.GpuBDF\x1a\r.devbox.Empty\x12@\n\tSpawnWarm\x12\x18.devbox.HostSpawnWarmReq\x1a\x19.devbox.HostSpawnWarmResp\x12\x46\n\x0b\x41\x63quireWarm\x12\x1a.devbox.HostAcquireWarmReq\x1a\x1b.devbox.HostAcquireWarmResp\x12\x46\n\x0b\x46\x61stRestore\x12\x1a.devbox.HostFastRestoreReq\x1a\x1b.devbox.HostFastRestoreResp\x12&\n\x07Unpause\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12$\n\x05Pause\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12&\n\x07\x44\x65stroy\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12-\n\x04\x45xec\x12\x13.devbox.HostExecReq\x1a\x10.devbox.ExecResp\x12\x36\n\x0bGetOverlays\x12\x12.devbox.OverlayReq\x1a\x13.devbox.OverlayResp2\x9c\x01\n\x08\x41gentAPI\x12\x30\n\x0bSelfTestGpu\x12\r.devbox.Empty\x1a\x12.devbox.HealthResp\x12-\n\x04\x45xec\x12\x13.devbox.HostExecReq\x1a\x10.devbox.ExecResp\x12/\n\x0fTeardownCleanup\x12\r.devbox.Empty\x1a\r.devbox.EmptyB\'Z%github.com/yourorg/devbox/proto;protob\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tapi.proto\x12\x06\x64\x65vbox\"\x07\n\x05\x45mpty\"8\n\x05Shape\x12\x0c\n\x04vcpu\x18\x01 \x01(\x05\x12\x0e\n\x06ram_gb\x18\x02 \x01(\x05\x12\x11\n\tgpu_model\x18\x03 \x01(\t\"\x19\n\x0bSnapshotRef\x12\n\n\x02id\x18\x01 \x01(\t\"H\n\x08VMHandle\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\x12\n\n\x02ip\x18\x03 \x01(\t\x12\x13\n\x0bssh_key_ref\x18\x04 \x01(\t\"\x19\n\x06PoolId\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\"+\n\x08PoolSpec\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\ttenant_id\x18\x02 \x01(\t\"B\n\x04Pool\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\ttenant_id\x18\x03 \x01(\t\x12\r\n\x05hosts\x18\x04 \x03(\t\"$\n\x11ListPoolsHostsReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\"#\n\x12ListPoolsHostsResp\x12\r\n\x05hosts\x18\x01 \x03(\t\",\n\rListPoolsResp\x12\x1b\n\x05pools\x18\x01 \x03(\x0b\x32\x0c.devbox.Pool\"/\n\rCreatePoolReq\x12\x1e\n\x04spec\x18\x01 \x01(\x0b\x32\x10.devbox.PoolSpec\",\n\x0e\x43reatePoolResp\x12\x1a\n\x04pool\x18\x01 \x01(\x0b\x32\x0c.devbox.Pool\"0\n\nAddHostReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\x12\x11\n\thost_addr\x18\x02 \x01(\t\".\n\rRemoveHostReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\"\x89\x01\n\x11\x45nsureWarmPoolReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x0e\n\x06target\x18\x02 \x01(\x05\x12%\n\x08snapshot\x18\x03 \x01(\x0b\x32\x13.devbox.SnapshotRef\x12\x0f\n\x07pool_id\x18\x04 \x01(\t\x12\x0e\n\x06\x66\x61nout\x18\x05 \x01(\r\"Y\n\x12\x45nsureWarmPoolResp\x12\x0f\n\x07\x63urrent\x18\x01 \x01(\x05\x12\x0e\n\x06vm_ids\x18\x02 \x03(\t\x12\"\n\x06\x65rrors\x18\x03 \x03(\x0b\x32\x12.devbox.SpawnError\"8\n\nSpawnError\x12\r\n\x05index\x18\x01 \x01(\r\x12\x0c\n\x04host\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"{\n\x0c\x41utoscaleReq\x12\x0f\n\x07pool_id\x18\x01 \x01(\t\x12\x1c\n\x05shape\x18\x02 \x01(\x0b\x32\r.devbox.Shape\x12\x0b\n\x03min\x18\x03 \x01(\r\x12\x0b\n\x03max\x18\x04 \x01(\r\x12\x10\n\x08headroom\x18\x05 \x01(\r\x12\x10\n\x08idle_sec\x18\x06 \x01(\r\"L\n\nAcquireReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x0f\n\x07pool_id\x18\x02 \x01(\t\x12\x0f\n\x07wait_ms\x18\x03 \x01(\r\"+\n\x0b\x41\x63quireResp\x12\x1c\n\x02vm\x18\x01 \x01(\x0b\x32\x10.devbox.VMHandle\",\n\nReleaseReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0f\n\x07recycle\x18\x02 \x01(\x08\";\n\x07\x45xecReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x02 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x03 \x01(\x05\"=\n\x08\x45xecResp\x12\x11\n\texit_code\x18\x01 \x01(\x05\x12\x0e\n\x06stdout\x18\x02 \x01(\x0c\x12\x0e\n\x06stderr\x18\x03 \x01(\x0c\"_\n\tExecInput\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x02 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x03 \x01(\x05\x12\r\n\x05stdin\x18\x04 \x01(\x0c\x12\x11\n\tstdin_eof\x18\x05 \x01(\x08\"N\n\tExecChunk\x12\x0e\n\x06stdout\x18\x01 \x01(\x0c\x12\x0e\n\x06stderr\x18\x02 \x01(\x0c\x12\x0e\n\x06\x65xited\x18\x03 \x01(\x08\x12\x11\n\texit_code\x18\x04 \x01(\x05\"\xac\x01\n\nMapExecReq\x12\x0e\n\x06vm_ids\x18\x01 \x03(\t\x12\x0f\n\x07pool_id\x18\x02 \x01(\t\x12\x16\n\x0e\x64\x65scendants_of\x18\x03 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x04 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x05 \x01(\x05\x12\x10\n\x08parallel\x18\x06 \x01(\r\x12\x17\n\x0fstop_on_success\x18\x07 \x01(\x08\x12\x17\n\x0fstop_on_failure\x18\x08 \x01(\x08\"l\n\rMapExecResult\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\x12\r\n\x05index\x18\x03 \x01(\r\x12 \n\x06result\x18\x04 \x01(\x0b\x32\x10.devbox.ExecResp\x12\r\n\x05\x65rror\x18\x05 \x01(\t\"\x1c\n\nHealthResp\x12\x0e\n\x06status\x18\x01 \x01(\t\"\x8f\x01\n\rInventoryResp\x12\x0c\n\x04host\x18\x01 \x01(\t\x12\x0c\n\x04\x63pus\x18\x02 \x01(\x05\x12\x11\n\tmem_bytes\x18\x03 \x01(\x03\x12\x10\n\x08gpus_bdf\x18\x04 \x03(\t\x12\x11\n\tgpus_numa\x18\x05 \x03(\x05\x12\x16\n\x0eshared_storage\x18\x06 \x01(\x08\x12\x12\n\nexited_vms\x18\x07 \x03(\t\"\xac\x01\n\x10HostSpawnWarmReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x38\n\x08snapshot\x18\x02 \x03(\x0b\x32&.devbox.HostSpawnWarmReq.SnapshotEntry\x12\x0f\n\x07gpu_bdf\x18\x03 \x01(\t\x1a/\n\rSnapshotEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"@\n\x11HostSpawnWarmResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\r\n\x05\x65rror\x18\x02 \x01(\t\x12\r\n\x05index\x18\x03 \x01(\r\"\xd8\x01\n\x15HostSpawnWarmBatchReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12=\n\x08snapshot\x18\x02 \x03(\x0b\x32+.devbox.HostSpawnWarmBatchReq.SnapshotEntry\x12\r\n\x05\x63ount\x18\x03 \x01(\r\x12\x10\n\x08gpu_bdfs\x18\x04 \x03(\t\x12\x10\n\x08parallel\x18\x05 \x01(\r\x1a/\n\rSnapshotEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"2\n\x12HostAcquireWarmReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\"$\n\x13HostAcquireWarmResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\"\xad\x01\n\x12HostFastRestoreReq\x12\x1c\n\x05shape\x18\x01 \x01(\x0b\x32\r.devbox.Shape\x12\x38\n\x07overlay\x18\x02 \x03(\x0b\x32\'.devbox.HostFastRestoreReq.OverlayEntry\x12\x0f\n\x07gpu_bdf\x18\x03 \x01(\t\x1a.\n\x0cOverlayEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"$\n\x13HostFastRestoreResp\x12\r\n\x05vm_id\x18\x01 \x01(\t\"*\n\x0bHostSaveReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04lazy\x18\x02 \x01(\x08\"\x87\x01\n\x0cHostSaveResp\x12\x13\n\x0bsnapshot_id\x18\x01 \x01(\t\x12\x32\n\x07overlay\x18\x02 \x03(\x0b\x32!.devbox.HostSaveResp.OverlayEntry\x1a.\n\x0cOverlayEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x15\n\x04VMId\x12\r\n\x05vm_id\x18\x01 \x01(\t\"?\n\x0bHostExecReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04\x61rgv\x18\x02 \x03(\t\x12\x13\n\x0btimeout_sec\x18\x03 \x01(\x05\"\x15\n\x06GpuBDF\x12\x0b\n\x03\x62\x64\x66\x18\x01 \x01(\t\"]\n\x07\x46orkReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x10\n\x08how_many\x18\x02 \x01(\r\x12\x0e\n\x06pinned\x18\x03 \x01(\x08\x12\x11\n\tcold_fork\x18\x04 \x01(\x08\x12\x0e\n\x06\x66\x61nout\x18\x05 \x01(\r\">\n\x08\x46orkResp\x12\x0e\n\x06vm_ids\x18\x01 \x03(\t\x12\"\n\x06\x65rrors\x18\x02 \x03(\x0b\x32\x12.devbox.SpawnError\"\x1b\n\nOverlayReq\x12\r\n\x05vm_id\x18\x01 \x01(\t\"s\n\x0bOverlayResp\x12\x33\n\x08overlays\x18\x01 \x03(\x0b\x32!.devbox.OverlayResp.OverlaysEntry\x1a/\n\rOverlaysEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"=\n\x08VMIdList\x12\x0e\n\x06vm_ids\x18\x01 \x03(\t\x12\x0f\n\x07pool_id\x18\x02 \x01(\t\x12\x10\n\x08parallel\x18\x03 \x01(\r\"6\n\x08VMResult\x12\r\n\x05vm_id\x18\x01 \x01(\t\x12\x0c\n\x04host\x18\x02 \x01(\t\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"-\n\x08\x42ulkResp\x12!\n\x07results\x18\x01 \x03(\x0b\x32\x10.devbox.VMResult2\xe2\x06\n\rControllerAPI\x12;\n\nCreatePool\x12\x15.devbox.CreatePoolReq\x1a\x16.devbox.CreatePoolResp\x12\x31\n\tListPools\x12\r.devbox.Empty\x1a\x15.devbox.ListPoolsResp\x12\x46\n\rListPoolHosts\x12\x19.devbox.ListPoolsHostsReq\x1a\x1a.devbox.ListPoolsHostsResp\x12G\n\x0e\x45nsureWarmPool\x12\x19.devbox.EnsureWarmPoolReq\x1a\x1a.devbox.EnsureWarmPoolResp\x12\x33\n\x0cSetAutoscale\x12\x14.devbox.AutoscaleReq\x1a\r.devbox.Empty\x12\x32\n\x07\x41\x63quire\x12\x12.devbox.AcquireReq\x1a\x13.devbox.AcquireResp\x12,\n\x07Release\x12\x12.devbox.ReleaseReq\x1a\r.devbox.Empty\x12)\n\x04\x45xec\x12\x0f.devbox.ExecReq\x1a\x10.devbox.ExecResp\x12\x36\n\nExecStream\x12\x11.devbox.ExecInput\x1a\x11.devbox.ExecChunk(\x01\x30\x01\x12\x36\n\x07MapExec\x12\x12.devbox.MapExecReq\x1a\x15.devbox.MapExecResult0\x01\x12+\n\x06Health\x12\r.devbox.Empty\x1a\x12.devbox.HealthResp\x12)\n\x04\x46ork\x12\x0f.devbox.ForkReq\x1a\x10.devbox.ForkResp\x12/\n\tPauseMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp\x12\x31\n\x0bUnpauseMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp\x12\x31\n\x0b\x44\x65stroyMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp\x12/\n\tDrainPool\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp2\xda\x07\n\x08HostdAPI\x12\x37\n\x0fReportInventory\x12\r.devbox.Empty\x1a\x15.devbox.InventoryResp\x12.\n\rBindGpuToVfio\x12\x0e.devbox.GpuBDF\x1a\r.devbox.Empty\x12)\n\x08GpuReset\x12\x0e.devbox.GpuBDF\x1a\r.devbox.Empty\x12@\n\tSpawnWarm\x12\x18.devbox.HostSpawnWarmReq\x1a\x19.devbox.HostSpawnWarmResp\x12L\n\x0eSpawnWarmBatch\x12\x1d.devbox.HostSpawnWarmBatchReq\x1a\x19.devbox.HostSpawnWarmResp0\x01\x12\x46\n\x0b\x41\x63quireWarm\x12\x1a.devbox.HostAcquireWarmReq\x1a\x1b.devbox.HostAcquireWarmResp\x12\x46\n\x0b\x46\x61stRestore\x12\x1a.devbox.HostFastRestoreReq\x1a\x1b.devbox.HostFastRestoreResp\x12\x33\n\x06SaveVM\x12\x13.devbox.HostSaveReq\x1a\x14.devbox.HostSaveResp\x12&\n\x07Unpause\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12$\n\x05Pause\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12&\n\x07\x44\x65stroy\x12\x0c.devbox.VMId\x1a\r.devbox.Empty\x12-\n\x04\x45xec\x12\x13.devbox.HostExecReq\x1a\x10.devbox.ExecResp\x12\x36\n\nExecStream\x12\x11.devbox.ExecInput\x1a\x11.devbox.ExecChunk(\x01\x30\x01\x12\x36\n\x0bGetOverlays\x12\x12.devbox.OverlayReq\x1a\x13.devbox.OverlayResp\x12\x39\n\x0ePrepareHotFork\x12\x12.devbox.OverlayReq\x1a\x13.devbox.OverlayResp\x12/\n\tPauseMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp\x12\x31\n\x0bUnpauseMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp\x12\x31\n\x0b\x44\x65stroyMany\x12\x10.devbox.VMIdList\x1a\x10.devbox.BulkResp2\xd4\x01\n\x08\x41gentAPI\x12\x30\n\x0bSelfTestGpu\x12\r.devbox.Empty\x1a\x12.devbox.HealthResp\x12-\n\x04\x45xec\x12\x13.devbox.HostExecReq\x1a\x10.devbox.ExecResp\x12\x36\n\nExecStream\x12\x11.devbox.ExecInput\x1a\x11.devbox.ExecChunk(\x01\x30\x01\x12/\n\x0fTeardownCleanup\x12\r.devbox.Empty\x1a\r.devbox.EmptyB\'Z%github.com/yourorg/devbox/proto;protob\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -24,8 +24,12 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['DESCRIPTOR']._serialized_options = b'Z%github.com/yourorg/devbox/proto;proto'
   _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._loaded_options = None
   _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._serialized_options = b'8\001'
+  _globals['_HOSTSPAWNWARMBATCHREQ_SNAPSHOTENTRY']._loaded_options = None
+  _globals['_HOSTSPAWNWARMBATCHREQ_SNAPSHOTENTRY']._serialized_options = b'8\001'
   _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._loaded_options = None
   _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._serialized_options = b'8\001'
+  _globals['_HOSTSAVERESP_OVERLAYENTRY']._loaded_options = None
+  _globals['_HOSTSAVERESP_OVERLAYENTRY']._serialized_options = b'8\001'
   _globals['_OVERLAYRESP_OVERLAYSENTRY']._loaded_options = None
   _globals['_OVERLAYRESP_OVERLAYSENTRY']._serialized_options = b'8\001'
   _globals['_EMPTY']._serialized_start=21
@@ -56,60 +60,88 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ADDHOSTREQ']._serialized_end=593
   _globals['_REMOVEHOSTREQ']._serialized_start=595
   _globals['_REMOVEHOSTREQ']._serialized_end=641
-  _globals['_ENSUREWARMPOOLREQ']._serialized_start=643
-  _globals['_ENSUREWARMPOOLREQ']._serialized_end=764
-  _globals['_ENSUREWARMPOOLRESP']._serialized_start=766
-  _globals['_ENSUREWARMPOOLRESP']._serialized_end=803
-  _globals['_ACQUIREREQ']._serialized_start=805
-  _globals['_ACQUIREREQ']._serialized_end=847
-  _globals['_ACQUIRERESP']._serialized_start=849
-  _globals['_ACQUIRERESP']._serialized_end=892
-  _globals['_RELEASEREQ']._serialized_start=894
-  _globals['_RELEASEREQ']._serialized_end=938
-  _globals['_EXECREQ']._serialized_start=940
-  _globals['_EXECREQ']._serialized_end=999
-  _globals['_EXECRESP']._serialized_start=1001
-  _globals['_EXECRESP']._serialized_end=1062
-  _globals['_HEALTHRESP']._serialized_start=1064
-  _globals['_HEALTHRESP']._serialized_end=1092
-  _globals['_INVENTORYRESP']._serialized_start=1094
-  _globals['_INVENTORYRESP']._serialized_end=1193
-  _globals['_HOSTSPAWNWARMREQ']._serialized_start=1196
-  _globals['_HOSTSPAWNWARMREQ']._serialized_end=1368
-  _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._serialized_start=1321
-  _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._serialized_end=1368
-  _globals['_HOSTSPAWNWARMRESP']._serialized_start=1370
-  _globals['_HOSTSPAWNWARMRESP']._serialized_end=1404
-  _globals['_HOSTACQUIREWARMREQ']._serialized_start=1406
-  _globals['_HOSTACQUIREWARMREQ']._serialized_end=1456
-  _globals['_HOSTACQUIREWARMRESP']._serialized_start=1458
-  _globals['_HOSTACQUIREWARMRESP']._serialized_end=1494
-  _globals['_HOSTFASTRESTOREREQ']._serialized_start=1497
-  _globals['_HOSTFASTRESTOREREQ']._serialized_end=1670
-  _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._serialized_start=1624
-  _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._serialized_end=1670
-  _globals['_HOSTFASTRESTORERESP']._serialized_start=1672
-  _globals['_HOSTFASTRESTORERESP']._serialized_end=1708
-  _globals['_VMID']._serialized_start=1710
-  _globals['_VMID']._serialized_end=1731
-  _globals['_HOSTEXECREQ']._serialized_start=1733
-  _globals['_HOSTEXECREQ']._serialized_end=1796
-  _globals['_GPUBDF']._serialized_start=1798
-  _globals['_GPUBDF']._serialized_end=1819
-  _globals['_FORKREQ']._serialized_start=1821
-  _globals['_FORKREQ']._serialized_end=1898
-  _globals['_FORKRESP']._serialized_start=1900
-  _globals['_FORKRESP']._serialized_end=1926
-  _globals['_OVERLAYREQ']._serialized_start=1928
-  _globals['_OVERLAYREQ']._serialized_end=1955
-  _globals['_OVERLAYRESP']._serialized_start=1957
-  _globals['_OVERLAYRESP']._serialized_end=2072
-  _globals['_OVERLAYRESP_OVERLAYSENTRY']._serialized_start=2025
-  _globals['_OVERLAYRESP_OVERLAYSENTRY']._serialized_end=2072
-  _globals['_CONTROLLERAPI']._serialized_start=2075
-  _globals['_CONTROLLERAPI']._serialized_end=2576
-  _globals['_HOSTDAPI']._serialized_start=2579
-  _globals['_HOSTDAPI']._serialized_end=3168
-  _globals['_AGENTAPI']._serialized_start=3171
-  _globals['_AGENTAPI']._serialized_end=3327
+  _globals['_ENSUREWARMPOOLREQ']._serialized_start=644
+  _globals['_ENSUREWARMPOOLREQ']._serialized_end=781
+  _globals['_ENSUREWARMPOOLRESP']._serialized_start=783
+  _globals['_ENSUREWARMPOOLRESP']._serialized_end=872
+  _globals['_SPAWNERROR']._serialized_start=874
+  _globals['_SPAWNERROR']._serialized_end=930
+  _globals['_AUTOSCALEREQ']._serialized_start=932
+  _globals['_AUTOSCALEREQ']._serialized_end=1055
+  _globals['_ACQUIREREQ']._serialized_start=1057
+  _globals['_ACQUIREREQ']._serialized_end=1133
+  _globals['_ACQUIRERESP']._serialized_start=1135
+  _globals['_ACQUIRERESP']._serialized_end=1178
+  _globals['_RELEASEREQ']._serialized_start=1180
+  _globals['_RELEASEREQ']._serialized_end=1224
+  _globals['_EXECREQ']._serialized_start=1226
+  _globals['_EXECREQ']._serialized_end=1285
+  _globals['_EXECRESP']._serialized_start=1287
+  _globals['_EXECRESP']._serialized_end=1348
+  _globals['_EXECINPUT']._serialized_start=1350
+  _globals['_EXECINPUT']._serialized_end=1445
+  _globals['_EXECCHUNK']._serialized_start=1447
+  _globals['_EXECCHUNK']._serialized_end=1525
+  _globals['_MAPEXECREQ']._serialized_start=1528
+  _globals['_MAPEXECREQ']._serialized_end=1700
+  _globals['_MAPEXECRESULT']._serialized_start=1702
+  _globals['_MAPEXECRESULT']._serialized_end=1810
+  _globals['_HEALTHRESP']._serialized_start=1812
+  _globals['_HEALTHRESP']._serialized_end=1840
+  _globals['_INVENTORYRESP']._serialized_start=1843
+  _globals['_INVENTORYRESP']._serialized_end=1986
+  _globals['_HOSTSPAWNWARMREQ']._serialized_start=1989
+  _globals['_HOSTSPAWNWARMREQ']._serialized_end=2161
+  _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._serialized_start=2114
+  _globals['_HOSTSPAWNWARMREQ_SNAPSHOTENTRY']._serialized_end=2161
+  _globals['_HOSTSPAWNWARMRESP']._serialized_start=2163
+  _globals['_HOSTSPAWNWARMRESP']._serialized_end=2227
+  _globals['_HOSTSPAWNWARMBATCHREQ']._serialized_start=2230
+  _globals['_HOSTSPAWNWARMBATCHREQ']._serialized_end=2446
+  _globals['_HOSTSPAWNWARMBATCHREQ_SNAPSHOTENTRY']._serialized_start=2114
+  _globals['_HOSTSPAWNWARMBATCHREQ_SNAPSHOTENTRY']._serialized_end=2161
+  _globals['_HOSTACQUIREWARMREQ']._serialized_start=2448
+  _globals['_HOSTACQUIREWARMREQ']._serialized_end=2498
+  _globals['_HOSTACQUIREWARMRESP']._serialized_start=2500
+  _globals['_HOSTACQUIREWARMRESP']._serialized_end=2536
+  _globals['_HOSTFASTRESTOREREQ']._serialized_start=2539
+  _globals['_HOSTFASTRESTOREREQ']._serialized_end=2712
+  _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._serialized_start=2666
+  _globals['_HOSTFASTRESTOREREQ_OVERLAYENTRY']._serialized_end=2712
+  _globals['_HOSTFASTRESTORERESP']._serialized_start=2714
+  _globals['_HOSTFASTRESTORERESP']._serialized_end=2750
+  _globals['_HOSTSAVEREQ']._serialized_start=2752
+  _globals['_HOSTSAVEREQ']._serialized_end=2794
+  _globals['_HOSTSAVERESP']._serialized_start=2797
+  _globals['_HOSTSAVERESP']._serialized_end=2932
+  _globals['_HOSTSAVERESP_OVERLAYENTRY']._serialized_start=2666
+  _globals['_HOSTSAVERESP_OVERLAYENTRY']._serialized_end=2712
+  _globals['_VMID']._serialized_start=2934
+  _globals['_VMID']._serialized_end=2955
+  _globals['_HOSTEXECREQ']._serialized_start=2957
+  _globals['_HOSTEXECREQ']._serialized_end=3020
+  _globals['_GPUBDF']._serialized_start=3022
+  _globals['_GPUBDF']._serialized_end=3043
+  _globals['_FORKREQ']._serialized_start=3045
+  _globals['_FORKREQ']._serialized_end=3138
+  _globals['_FORKRESP']._serialized_start=3140
+  _globals['_FORKRESP']._serialized_end=3202
+  _globals['_OVERLAYREQ']._serialized_start=3204
+  _globals['_OVERLAYREQ']._serialized_end=3231
+  _globals['_OVERLAYRESP']._serialized_start=3233
+  _globals['_OVERLAYRESP']._serialized_end=3348
+  _globals['_OVERLAYRESP_OVERLAYSENTRY']._serialized_start=3301
+  _globals['_OVERLAYRESP_OVERLAYSENTRY']._serialized_end=3348
+  _globals['_VMIDLIST']._serialized_start=3350
+  _globals['_VMIDLIST']._serialized_end=3411
+  _globals['_VMRESULT']._serialized_start=3413
+  _globals['_VMRESULT']._serialized_end=3467
+  _globals['_BULKRESP']._serialized_start=3469
+  _globals['_BULKRESP']._serialized_end=3514
+  _globals['_CONTROLLERAPI']._serialized_start=3517
+  _globals['_CONTROLLERAPI']._serialized_end=4383
+  _globals['_HOSTDAPI']._serialized_start=4386
+  _globals['_HOSTDAPI']._serialized_end=5372
+  _globals['_AGENTAPI']._serialized_start=5375
+  _globals['_AGENTAPI']._serialized_end=5587
 # @@protoc_insertion_point(module_scope)
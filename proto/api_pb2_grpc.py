@@ -60,6 +60,11 @@ class ControllerAPIStub(object):
                 request_serializer=api__pb2.EnsureWarmPoolReq.SerializeToString,
                 response_deserializer=api__pb2.EnsureWarmPoolResp.FromString,
                 _registered_method=True)
+        self.SetAutoscale = channel.unary_unary(
+                '/devbox.ControllerAPI/SetAutoscale',
+                request_serializer=api__pb2.AutoscaleReq.SerializeToString,
+                response_deserializer=api__pb2.Empty.FromString,
+                _registered_method=True)
         self.Acquire = channel.unary_unary(
                 '/devbox.ControllerAPI/Acquire',
                 request_serializer=api__pb2.AcquireReq.SerializeToString,
@@ -75,6 +80,16 @@ class ControllerAPIStub(object):
                 request_serializer=api__pb2.ExecReq.SerializeToString,
                 response_deserializer=api__pb2.ExecResp.FromString,
                 _registered_method=True)
+        self.ExecStream = channel.stream_stream(
+                '/devbox.ControllerAPI/ExecStream',
+                request_serializer=api__pb2.ExecInput.SerializeToString,
+                response_deserializer=api__pb2.ExecChunk.FromString,
+                _registered_method=True)
+        self.MapExec = channel.unary_stream(
+                '/devbox.ControllerAPI/MapExec',
+                request_serializer=api__pb2.MapExecReq.SerializeToString,
+                response_deserializer=api__pb2.MapExecResult.FromString,
+                _registered_method=True)
         self.Health = channel.unary_unary(
                 '/devbox.ControllerAPI/Health',
                 request_serializer=api__pb2.Empty.SerializeToString,
@@ -85,6 +100,26 @@ class ControllerAPIStub(object):
                 request_serializer=api__pb2.ForkReq.SerializeToString,
                 response_deserializer=api__pb2.ForkResp.FromString,
                 _registered_method=True)
+        self.PauseMany = channel.unary_unary(
+                '/devbox.ControllerAPI/PauseMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
+        self.UnpauseMany = channel.unary_unary(
+                '/devbox.ControllerAPI/UnpauseMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
+        self.DestroyMany = channel.unary_unary(
+                '/devbox.ControllerAPI/DestroyMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
+        self.DrainPool = channel.unary_unary(
+                '/devbox.ControllerAPI/DrainPool',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
 
 
 class ControllerAPIServicer(object):
@@ -114,6 +149,12 @@ class ControllerAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SetAutoscale(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Acquire(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -132,6 +173,20 @@ class ControllerAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExecStream(self, request_iterator, context):
+        """hanging up kills the process
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def MapExec(self, request, context):
+        """stopping early (or hanging up) cancels the Execs still running
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Health(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -144,6 +199,33 @@ class ControllerAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def PauseMany(self, request, context):
+        """paused VMs go (back) on their pool's warm list, like Release(recycle)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UnpauseMany(self, request, context):
+        """and come off it, like Acquire; hot-fork templates are refused by both
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DestroyMany(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DrainPool(self, request, context):
+        """destroys every VM in pool_id and stops replenishing it
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ControllerAPIServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -167,6 +249,11 @@ def add_ControllerAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.EnsureWarmPoolReq.FromString,
                     response_serializer=api__pb2.EnsureWarmPoolResp.SerializeToString,
             ),
+            'SetAutoscale': grpc.unary_unary_rpc_method_handler(
+                    servicer.SetAutoscale,
+                    request_deserializer=api__pb2.AutoscaleReq.FromString,
+                    response_serializer=api__pb2.Empty.SerializeToString,
+            ),
             'Acquire': grpc.unary_unary_rpc_method_handler(
                     servicer.Acquire,
                     request_deserializer=api__pb2.AcquireReq.FromString,
@@ -182,6 +269,16 @@ def add_ControllerAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.ExecReq.FromString,
                     response_serializer=api__pb2.ExecResp.SerializeToString,
             ),
+            'ExecStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.ExecStream,
+                    request_deserializer=api__pb2.ExecInput.FromString,
+                    response_serializer=api__pb2.ExecChunk.SerializeToString,
+            ),
+            'MapExec': grpc.unary_stream_rpc_method_handler(
+                    servicer.MapExec,
+                    request_deserializer=api__pb2.MapExecReq.FromString,
+                    response_serializer=api__pb2.MapExecResult.SerializeToString,
+            ),
             'Health': grpc.unary_unary_rpc_method_handler(
                     servicer.Health,
                     request_deserializer=api__pb2.Empty.FromString,
@@ -192,6 +289,26 @@ def add_ControllerAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.ForkReq.FromString,
                     response_serializer=api__pb2.ForkResp.SerializeToString,
             ),
+            'PauseMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.PauseMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
+            'UnpauseMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.UnpauseMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
+            'DestroyMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.DestroyMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
+            'DrainPool': grpc.unary_unary_rpc_method_handler(
+                    servicer.DrainPool,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'devbox.ControllerAPI', rpc_method_handlers)
@@ -311,6 +428,33 @@ class ControllerAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SetAutoscale(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.ControllerAPI/SetAutoscale',
+            api__pb2.AutoscaleReq.SerializeToString,
+            api__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def Acquire(request,
             target,
@@ -392,6 +536,60 @@ class ControllerAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ExecStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/devbox.ControllerAPI/ExecStream',
+            api__pb2.ExecInput.SerializeToString,
+            api__pb2.ExecChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def MapExec(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/devbox.ControllerAPI/MapExec',
+            api__pb2.MapExecReq.SerializeToString,
+            api__pb2.MapExecResult.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def Health(request,
             target,
@@ -446,6 +644,114 @@ class ControllerAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def PauseMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.ControllerAPI/PauseMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UnpauseMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.ControllerAPI/UnpauseMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DestroyMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.ControllerAPI/DestroyMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DrainPool(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.ControllerAPI/DrainPool',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
 
 class HostdAPIStub(object):
     """Missing associated documentation comment in .proto file."""
@@ -476,6 +782,11 @@ class HostdAPIStub(object):
                 request_serializer=api__pb2.HostSpawnWarmReq.SerializeToString,
                 response_deserializer=api__pb2.HostSpawnWarmResp.FromString,
                 _registered_method=True)
+        self.SpawnWarmBatch = channel.unary_stream(
+                '/devbox.HostdAPI/SpawnWarmBatch',
+                request_serializer=api__pb2.HostSpawnWarmBatchReq.SerializeToString,
+                response_deserializer=api__pb2.HostSpawnWarmResp.FromString,
+                _registered_method=True)
         self.AcquireWarm = channel.unary_unary(
                 '/devbox.HostdAPI/AcquireWarm',
                 request_serializer=api__pb2.HostAcquireWarmReq.SerializeToString,
@@ -486,6 +797,11 @@ class HostdAPIStub(object):
                 request_serializer=api__pb2.HostFastRestoreReq.SerializeToString,
                 response_deserializer=api__pb2.HostFastRestoreResp.FromString,
                 _registered_method=True)
+        self.SaveVM = channel.unary_unary(
+                '/devbox.HostdAPI/SaveVM',
+                request_serializer=api__pb2.HostSaveReq.SerializeToString,
+                response_deserializer=api__pb2.HostSaveResp.FromString,
+                _registered_method=True)
         self.Unpause = channel.unary_unary(
                 '/devbox.HostdAPI/Unpause',
                 request_serializer=api__pb2.VMId.SerializeToString,
@@ -506,11 +822,36 @@ class HostdAPIStub(object):
                 request_serializer=api__pb2.HostExecReq.SerializeToString,
                 response_deserializer=api__pb2.ExecResp.FromString,
                 _registered_method=True)
+        self.ExecStream = channel.stream_stream(
+                '/devbox.HostdAPI/ExecStream',
+                request_serializer=api__pb2.ExecInput.SerializeToString,
+                response_deserializer=api__pb2.ExecChunk.FromString,
+                _registered_method=True)
         self.GetOverlays = channel.unary_unary(
                 '/devbox.HostdAPI/GetOverlays',
                 request_serializer=api__pb2.OverlayReq.SerializeToString,
                 response_deserializer=api__pb2.OverlayResp.FromString,
                 _registered_method=True)
+        self.PrepareHotFork = channel.unary_unary(
+                '/devbox.HostdAPI/PrepareHotFork',
+                request_serializer=api__pb2.OverlayReq.SerializeToString,
+                response_deserializer=api__pb2.OverlayResp.FromString,
+                _registered_method=True)
+        self.PauseMany = channel.unary_unary(
+                '/devbox.HostdAPI/PauseMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
+        self.UnpauseMany = channel.unary_unary(
+                '/devbox.HostdAPI/UnpauseMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
+        self.DestroyMany = channel.unary_unary(
+                '/devbox.HostdAPI/DestroyMany',
+                request_serializer=api__pb2.VMIdList.SerializeToString,
+                response_deserializer=api__pb2.BulkResp.FromString,
+                _registered_method=True)
 
 
 class HostdAPIServicer(object):
@@ -540,6 +881,12 @@ class HostdAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SpawnWarmBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def AcquireWarm(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -552,6 +899,12 @@ class HostdAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SaveVM(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def Unpause(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -576,12 +929,43 @@ class HostdAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExecStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def GetOverlays(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def PrepareHotFork(self, request, context):
+        """parent becomes a paused template; returns overlay/memory/vmstate for children
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def PauseMany(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UnpauseMany(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def DestroyMany(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_HostdAPIServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -605,6 +989,11 @@ def add_HostdAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.HostSpawnWarmReq.FromString,
                     response_serializer=api__pb2.HostSpawnWarmResp.SerializeToString,
             ),
+            'SpawnWarmBatch': grpc.unary_stream_rpc_method_handler(
+                    servicer.SpawnWarmBatch,
+                    request_deserializer=api__pb2.HostSpawnWarmBatchReq.FromString,
+                    response_serializer=api__pb2.HostSpawnWarmResp.SerializeToString,
+            ),
             'AcquireWarm': grpc.unary_unary_rpc_method_handler(
                     servicer.AcquireWarm,
                     request_deserializer=api__pb2.HostAcquireWarmReq.FromString,
@@ -615,6 +1004,11 @@ def add_HostdAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.HostFastRestoreReq.FromString,
                     response_serializer=api__pb2.HostFastRestoreResp.SerializeToString,
             ),
+            'SaveVM': grpc.unary_unary_rpc_method_handler(
+                    servicer.SaveVM,
+                    request_deserializer=api__pb2.HostSaveReq.FromString,
+                    response_serializer=api__pb2.HostSaveResp.SerializeToString,
+            ),
             'Unpause': grpc.unary_unary_rpc_method_handler(
                     servicer.Unpause,
                     request_deserializer=api__pb2.VMId.FromString,
@@ -635,11 +1029,36 @@ def add_HostdAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.HostExecReq.FromString,
                     response_serializer=api__pb2.ExecResp.SerializeToString,
             ),
+            'ExecStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.ExecStream,
+                    request_deserializer=api__pb2.ExecInput.FromString,
+                    response_serializer=api__pb2.ExecChunk.SerializeToString,
+            ),
             'GetOverlays': grpc.unary_unary_rpc_method_handler(
                     servicer.GetOverlays,
                     request_deserializer=api__pb2.OverlayReq.FromString,
                     response_serializer=api__pb2.OverlayResp.SerializeToString,
             ),
+            'PrepareHotFork': grpc.unary_unary_rpc_method_handler(
+                    servicer.PrepareHotFork,
+                    request_deserializer=api__pb2.OverlayReq.FromString,
+                    response_serializer=api__pb2.OverlayResp.SerializeToString,
+            ),
+            'PauseMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.PauseMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
+            'UnpauseMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.UnpauseMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
+            'DestroyMany': grpc.unary_unary_rpc_method_handler(
+                    servicer.DestroyMany,
+                    request_deserializer=api__pb2.VMIdList.FromString,
+                    response_serializer=api__pb2.BulkResp.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'devbox.HostdAPI', rpc_method_handlers)
@@ -759,6 +1178,33 @@ class HostdAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SpawnWarmBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/devbox.HostdAPI/SpawnWarmBatch',
+            api__pb2.HostSpawnWarmBatchReq.SerializeToString,
+            api__pb2.HostSpawnWarmResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def AcquireWarm(request,
             target,
@@ -813,6 +1259,33 @@ class HostdAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SaveVM(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.HostdAPI/SaveVM',
+            api__pb2.HostSaveReq.SerializeToString,
+            api__pb2.HostSaveResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def Unpause(request,
             target,
@@ -921,6 +1394,33 @@ class HostdAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ExecStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/devbox.HostdAPI/ExecStream',
+            api__pb2.ExecInput.SerializeToString,
+            api__pb2.ExecChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def GetOverlays(request,
             target,
@@ -948,6 +1448,114 @@ class HostdAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def PrepareHotFork(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.HostdAPI/PrepareHotFork',
+            api__pb2.OverlayReq.SerializeToString,
+            api__pb2.OverlayResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def PauseMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.HostdAPI/PauseMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def UnpauseMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.HostdAPI/UnpauseMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def DestroyMany(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/devbox.HostdAPI/DestroyMany',
+            api__pb2.VMIdList.SerializeToString,
+            api__pb2.BulkResp.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
 
 class AgentAPIStub(object):
     """Missing associated documentation comment in .proto file."""
@@ -968,6 +1576,11 @@ class AgentAPIStub(object):
                 request_serializer=api__pb2.HostExecReq.SerializeToString,
                 response_deserializer=api__pb2.ExecResp.FromString,
                 _registered_method=True)
+        self.ExecStream = channel.stream_stream(
+                '/devbox.AgentAPI/ExecStream',
+                request_serializer=api__pb2.ExecInput.SerializeToString,
+                response_deserializer=api__pb2.ExecChunk.FromString,
+                _registered_method=True)
         self.TeardownCleanup = channel.unary_unary(
                 '/devbox.AgentAPI/TeardownCleanup',
                 request_serializer=api__pb2.Empty.SerializeToString,
@@ -990,6 +1603,12 @@ class AgentAPIServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ExecStream(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def TeardownCleanup(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -1009,6 +1628,11 @@ def add_AgentAPIServicer_to_server(servicer, server):
                     request_deserializer=api__pb2.HostExecReq.FromString,
                     response_serializer=api__pb2.ExecResp.SerializeToString,
             ),
+            'ExecStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.ExecStream,
+                    request_deserializer=api__pb2.ExecInput.FromString,
+                    response_serializer=api__pb2.ExecChunk.SerializeToString,
+            ),
             'TeardownCleanup': grpc.unary_unary_rpc_method_handler(
                     servicer.TeardownCleanup,
                     request_deserializer=api__pb2.Empty.FromString,
@@ -1079,6 +1703,33 @@ class AgentAPI(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ExecStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/devbox.AgentAPI/ExecStream',
+            api__pb2.ExecInput.SerializeToString,
+            api__pb2.ExecChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def TeardownCleanup(request,
             target,